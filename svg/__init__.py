@@ -1,3 +1,5 @@
 
 from canvas import Canvas
 from group import Group
+from loader import load
+from patch import diff
@@ -0,0 +1,232 @@
+'''Affine transformation matrices, stored as (a, b, c, d, e, f) tuples in the
+same order as the SVG matrix() transform:
+
+    [ [a  c  e]
+      [b  d  f]
+      [0  0  1] ]
+
+Functions accepting matrices treat None as the identity, so elements without
+a transformation need not store one.'''
+
+import math
+import re
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+# the tolerance used when testing matrices for special forms
+EPSILON = 1e-9
+
+# one transformation in an SVG transform list, and the numbers it holds
+_TRANSFORM = re.compile(r'[\s,]*(matrix|translate|scale|rotate|skewX|skewY)'
+                        r'\s*\(([^)]*)\)')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+def multiply(m1, m2):
+    '''Return the product m1 x m2, the transformation that applies m2 first
+    and then m1. This is how a transformation list composes in SVG, where
+    "A B" means A x B. Returns None if both matrices are None.
+
+    @param m1: tuple
+        the outer matrix
+    @param m2: tuple
+        the inner matrix'''
+
+    if m1 is None:
+        return m2
+    if m2 is None:
+        return m1
+
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+
+    return (a1 * a2 + c1 * b2,
+            b1 * a2 + d1 * b2,
+            a1 * c2 + c1 * d2,
+            b1 * c2 + d1 * d2,
+            a1 * e2 + c1 * f2 + e1,
+            b1 * e2 + d1 * f2 + f1)
+
+def translation(tx, ty):
+    '''Return the matrix of a translation.
+
+    @param tx: float
+        the x translation
+    @param ty: float
+        the y translation'''
+
+    return (1.0, 0.0, 0.0, 1.0, float(tx), float(ty))
+
+def scaling(sx, sy):
+    '''Return the matrix of a scaling.
+
+    @param sx: float
+        the x scaling factor
+    @param sy: float
+        the y scaling factor'''
+
+    return (float(sx), 0.0, 0.0, float(sy), 0.0, 0.0)
+
+def rotation(theta, cx=0.0, cy=0.0):
+    '''Return the matrix of a rotation about a point.
+
+    @param theta: float
+        the angle, in degrees, of rotation
+    @param cx: optional, float
+        the x-center of rotation
+    @param cy: optional, float
+        the y-center of rotation'''
+
+    theta = math.radians(theta)
+    cos, sin = math.cos(theta), math.sin(theta)
+
+    return (cos, sin, -sin, cos,
+            cx - cos * cx + sin * cy,
+            cy - sin * cx - cos * cy)
+
+def skewing_x(theta):
+    '''Return the matrix of a skew in the x direction.
+
+    @param theta: float
+        the angle, in degrees, of the skew'''
+
+    return (1.0, 0.0, math.tan(math.radians(theta)), 1.0, 0.0, 0.0)
+
+def skewing_y(theta):
+    '''Return the matrix of a skew in the y direction.
+
+    @param theta: float
+        the angle, in degrees, of the skew'''
+
+    return (1.0, math.tan(math.radians(theta)), 0.0, 1.0, 0.0, 0.0)
+
+def apply(m, x, y):
+    '''Return the point (x, y) transformed by m.
+
+    @param m: tuple
+        the matrix
+    @param x: float
+        the x-coordinate of the point
+    @param y: float
+        the y-coordinate of the point'''
+
+    if m is None:
+        return x, y
+
+    a, b, c, d, e, f = m
+    return a * x + c * y + e, b * x + d * y + f
+
+def is_translation(m):
+    '''Return whether m only translates.
+
+    @param m: tuple
+        the matrix'''
+
+    a, b, c, d = m[:4]
+    return (abs(a - 1.0) < EPSILON and abs(b) < EPSILON and
+            abs(c) < EPSILON and abs(d - 1.0) < EPSILON)
+
+def is_axis_aligned(m):
+    '''Return whether m maps horizontal and vertical lines to horizontal and
+    vertical lines, without swapping them.
+
+    @param m: tuple
+        the matrix'''
+
+    return abs(m[1]) < EPSILON and abs(m[2]) < EPSILON
+
+def similarity_scale(m):
+    '''Return the uniform scaling factor of m if it is a similarity - a
+    combination of rotation, reflection, uniform scaling and translation -
+    or None otherwise.
+
+    @param m: tuple
+        the matrix'''
+
+    a, b, c, d = m[:4]
+    sx = math.hypot(a, b)
+    sy = math.hypot(c, d)
+
+    if abs(sx - sy) > EPSILON * max(sx, 1.0) or abs(a * c + b * d) > EPSILON * max(sx * sy, 1.0):
+        return None
+
+    return sx
+
+def determinant(m):
+    '''Return the determinant of the linear part of m.
+
+    @param m: tuple
+        the matrix'''
+
+    return m[0] * m[3] - m[1] * m[2]
+
+def inverse(m):
+    '''Return the inverse of m, which undoes it. Returns None if m is None,
+    and raises ValueError if m is singular, flattening the plane onto a line
+    or a point.
+
+    @param m: tuple
+        the matrix'''
+
+    if m is None:
+        return None
+
+    det = determinant(m)
+    if abs(det) < EPSILON:
+        raise ValueError('singular matrix cannot be inverted')
+
+    a, b, c, d, e, f = m
+    return (d / det, -b / det, -c / det, a / det,
+            (c * f - d * e) / det, (b * e - a * f) / det)
+
+def parse(text):
+    '''Return the matrix of an SVG transform list, such as the value of a
+    transform attribute, or None if the list is empty. Raises ValueError if
+    the list is malformed.
+
+    @param text: str
+        the transform list'''
+
+    matrix = None
+
+    pos = 0
+    end = len(text.rstrip())
+    while pos < end:
+        match = _TRANSFORM.match(text, pos)
+        if match is None:
+            raise ValueError('bad transform list: {!r}'.format(text))
+        pos = match.end()
+
+        name = match.group(1)
+        args = [float(v) for v in _NUMBER.findall(match.group(2))]
+        n = len(args)
+
+        if name == 'matrix' and n == 6:
+            m = tuple(args)
+        elif name == 'translate' and n in (1, 2):
+            m = translation(args[0], args[1] if n == 2 else 0.0)
+        elif name == 'scale' and n in (1, 2):
+            m = scaling(args[0], args[1] if n == 2 else args[0])
+        elif name == 'rotate' and n in (1, 3):
+            m = rotation(*args)
+        elif name == 'skewX' and n == 1:
+            m = skewing_x(args[0])
+        elif name == 'skewY' and n == 1:
+            m = skewing_y(args[0])
+        else:
+            raise ValueError('bad transform list: {!r}'.format(text))
+
+        matrix = multiply(matrix, m)
+
+    return matrix
+
+def render(m, number=None):
+    '''Return m as an SVG matrix() transform.
+
+    @param m: tuple
+        the matrix
+    @param number: optional, callable
+        the formatting of each number, str.format's if not given'''
+
+    if number is None:
+        return 'matrix({}, {}, {}, {}, {}, {})'.format(*m)
+    return 'matrix({})'.format(', '.join([number(v) for v in m]))
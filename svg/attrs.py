@@ -4,6 +4,8 @@ class Attrs(dict):
     '''A subclass of dict that allows access to keys through dot notation as
        well.'''
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         '''Create the Attrs object. The constructor parameters are simply
            forwarded to the dict constructor, so the same exact same types are
@@ -22,17 +24,18 @@ class Attrs(dict):
             if isinstance(v, collections.Mapping):
                 self[k] = Attrs(v)
 
-    def __getattribute__(self, name):
-        '''Get the attribute from this object. Look for a key with the same
-           name and return it if it exists.
+    def __getattr__(self, name):
+        '''Get the attribute from this object. This is only called when
+           normal attribute lookup fails, so the dict methods take precedence
+           over keys with the same name.
 
            @param name: str
                the name of the attribute'''
 
-        if name in self:
+        try:
             return self[name]
-
-        return super(Attrs, self).__getattribute__(name)
+        except KeyError:
+            raise AttributeError(name)
 
     def __setattr__(self, name, value):
         '''Set the attribute with name to value.
@@ -44,4 +47,34 @@ class Attrs(dict):
 
         self[name] = value
 
+class Attribute(object):
+    '''A descriptor declaring an SVG attribute on an element class. Reads go
+       straight to the element's attributes mapping, so declared attributes
+       cost about as much as ordinary attribute access. Writes are handled
+       by the element's __setattr__, like those of any other attribute.'''
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        '''Create the descriptor.
+
+           @param name: str
+               the name of the SVG attribute'''
+
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        '''Return the value of the attribute on obj.
+
+           @param obj: SVGBase
+               the element to read the attribute from
+           @param cls: optional, type
+               the class the descriptor was accessed through'''
+
+        if obj is None:
+            return self
 
+        try:
+            return obj.attributes[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
@@ -1,7 +1,83 @@
-from attrs import Attrs
+import weakref
+
+import affine
+import bounds
+from attrs import Attribute, Attrs
+from dedupe import XLINK, Symbols
+from lazy import LazyChildren, SharedChildren
+from options import RenderOptions
+from stylesheet import Stylesheet
+from values import escape_text, serializer
+
+# the formatting of attribute values rendered without render settings
+_PLAIN = serializer()
+
+# the shared and transient slots of each class of element
+_SLOTS = {}
+
+# the public slots of each class of element, set by attribute assignment
+_FIELDS = {}
 
 class SVGBase(object):
-    '''A class holding common functionality for all SVG objects.'''
+    '''A class holding common functionality for all SVG objects.
+
+    Element classes declare the SVG attributes they know about as Attribute
+    descriptors, which read the attributes mapping directly. Any other
+    attribute is looked up in the mapping by __getattr__, and every
+    attribute assignment is stored in the mapping, apart from assignments to
+    the public fields kept in slots, such as content, which set the field.
+
+    Elements use __slots__ rather than an instance dictionary, and the meta,
+    transform and children containers are only created when first used, so
+    leaf shapes stay small. Subclasses must declare __slots__ as well,
+    otherwise their instances get a __dict__ back.
+
+    When rendered with cache=True, every element keeps its rendered output
+    until it, or anything below it, is changed, and bounding boxes are kept
+    the same way. Changes made through item and attribute assignment,
+    add_child, the transformation methods and the Path drawing methods are
+    tracked automatically. Changes made by mutating the attributes, meta,
+    transform or children containers directly are not, and must be followed
+    by a call to invalidate().
+
+    clone() makes a copy-on-write copy of a subtree, which shares the
+    attributes, meta, transformation and children of the original, and only
+    copies each element, a level of children at a time, when it or something
+    below it is changed on either side. Changes made through the containers
+    directly are not noticed, and show through in clones still sharing them.'''
+
+    __slots__ = ('attributes', 'content', 'load_defaults', '_meta',
+                 '_transform', '_matrix', '_children', '_parent', '_cache',
+                 '_bounds', '_shared', '_clones')
+
+    # subclass-defined functions formatting attribute values for output, by
+    # attribute name - each is called with the value and the RenderOptions of
+    # the render, which is None outside of a full render
+    RENDERERS = {}
+
+    # common presentation attributes, declared so that reading them does not
+    # have to fall back to __getattr__
+    id = Attribute('id')
+    style = Attribute('style')
+    fill = Attribute('fill')
+    stroke = Attribute('stroke')
+    opacity = Attribute('opacity')
+    color = Attribute('color')
+    display = Attribute('display')
+    visibility = Attribute('visibility')
+
+    # the spatial index over this element's subtree - only groups build one,
+    # and changes are only reported to indexes once any group has
+    _index = None
+    _indexed = False
+
+    # whether any clone has been made, after which changes check for clones
+    # sharing what they are about to change
+    _cloned = False
+
+    # the number of clones registered with an element between purges of
+    # those that are gone
+    PURGE_CLONES = 64
 
     def __init__(self, *args, **kwargs):
         '''Create the SVGBase object.
@@ -18,10 +94,84 @@ class SVGBase(object):
 
         object.__setattr__(self, 'attributes', attributes)
         object.__setattr__(self, 'content', content)
-        object.__setattr__(self, 'meta', Attrs())
-        object.__setattr__(self, 'transform', list())
-        object.__setattr__(self, 'children', list())
         object.__setattr__(self, 'load_defaults', load_defaults)
+        object.__setattr__(self, '_meta', None)
+        object.__setattr__(self, '_transform', None)
+        object.__setattr__(self, '_matrix', None)
+        object.__setattr__(self, '_children', None)
+        object.__setattr__(self, '_parent', None)
+        object.__setattr__(self, '_cache', None)
+        object.__setattr__(self, '_bounds', None)
+        object.__setattr__(self, '_shared', False)
+        object.__setattr__(self, '_clones', None)
+
+    @property
+    def meta(self):
+        '''The metadata attributes of this element, created on first use.'''
+
+        if SVGBase._cloned:
+            self._own()
+
+        meta = self._meta
+        if meta is None:
+            meta = Attrs()
+            object.__setattr__(self, '_meta', meta)
+        return meta
+
+    @property
+    def transform(self):
+        '''The list of transformations applied to this element, created on
+        first use.'''
+
+        if SVGBase._cloned:
+            self._own()
+
+        transform = self._transform
+        if transform is None:
+            transform = list()
+            object.__setattr__(self, '_transform', transform)
+        return transform
+
+    @property
+    def transform_matrix(self):
+        '''The composition of the transformations applied to this element, as
+        an (a, b, c, d, e, f) affine matrix tuple - see the affine module.'''
+
+        matrix = self._matrix
+        return affine.IDENTITY if matrix is None else matrix
+
+    def device_matrix(self):
+        '''Return the transformation from this element's user space to the
+        coordinate system of the root of the tree it belongs to, composing
+        its own transformation with those of all its ancestors.'''
+
+        matrix = None
+        node = self
+        while node is not None:
+            matrix = affine.multiply(node._matrix, matrix)
+            node = node._parent
+
+        return matrix or affine.IDENTITY
+
+    @property
+    def children(self):
+        '''The list of child elements of this element, created on first
+        use.'''
+
+        children = self._children
+        if children is None:
+            children = list()
+            object.__setattr__(self, '_children', children)
+        elif type(children) is LazyChildren:
+            # the children of a loaded element are parsed on first use, and
+            # output cached before then was written without them
+            children = children.builder(self, children.raw)
+            object.__setattr__(self, '_children', children)
+            self._discard()
+        elif type(children) is SharedChildren:
+            # the children of a clone are cloned on first use
+            children = self._materialize()
+        return children
 
     def __getitem__(self, name):
         '''Return the attribute with the given name.
@@ -29,7 +179,7 @@ class SVGBase(object):
         @param name: str
             the name of the attribute to get'''
 
-        return object.__getattribute__(self, 'attributes')[name]
+        return self.attributes[name]
 
     def __setitem__(self, name, value):
         '''Forward the item assignment to the attributes mapping.
@@ -39,31 +189,235 @@ class SVGBase(object):
         @param value: object
             the new value of the attribute'''
 
-        object.__getattribute__(self, 'attributes')[name] = value
+        if SVGBase._cloned:
+            self._own()
+
+        self.attributes[name] = value
+        self.invalidate()
 
-    def __getattribute__(self, name):
-        '''Return the metadata if requested, otherwise look the attribute in
-        this SVG elements attributes structure.
+    def __getattr__(self, name):
+        '''Look up an attribute that is not declared on the element's class in
+        this SVG element's attributes structure. Declared attributes, methods
+        and the element's own state are found by normal attribute lookup and
+        never reach this method.
 
         @param name: str
             the name of the attribute to fetch'''
 
-        try:
-            return getattr(object.__getattribute__(self, 'attributes'), name)
-        except AttributeError:
-            pass
+        if name.startswith('__'):
+            raise AttributeError(name)
 
-        return object.__getattribute__(self, name)
+        try:
+            return object.__getattribute__(self, 'attributes')[name]
+        except (KeyError, AttributeError):
+            raise AttributeError(name)
 
     def __setattr__(self, name, value):
-        '''Set the value of attribute 'name'. 
-        
+        '''Set the value of attribute 'name', or of the field of that name
+        if it is one of the element's public slots, such as content.
+
         @param name: str
             the name of the attribute to set
         @param value: object
             the new value of the attribute'''
 
-        setattr(object.__getattribute__(self, 'attributes'), name, value)
+        if SVGBase._cloned:
+            self._own()
+
+        if name in _fields(type(self)):
+            object.__setattr__(self, name, value)
+        else:
+            self.attributes[name] = value
+        self.invalidate()
+
+    # the slots left out when pickling, which hold links up the tree and
+    # state that is cheaper to work out again than to ship
+    TRANSIENT = ('_parent', '_cache', '_bounds', '_index', '_shared',
+                 '_clones')
+
+    def __getstate__(self):
+        '''Return the state of this element for pickling, which includes its
+        subtree but not its parent, caches or spatial index.'''
+
+        transient = self.TRANSIENT
+
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name not in transient:
+                    state[name] = object.__getattribute__(self, name)
+        return state
+
+    def __setstate__(self, state):
+        '''Restore the state of this element after unpickling, and link its
+        children back to it.
+
+        @param state: dict
+            the state returned by __getstate__'''
+
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                object.__setattr__(self, name, state.get(name))
+
+        for child in self._children or ():
+            object.__setattr__(child, '_parent', self)
+
+    def invalidate(self):
+        '''Discard the cached output and bounding box of this element and of
+        all its ancestors, so that they are worked out again the next time
+        they are needed, and report the change to any spatial index above.'''
+
+        self._discard()
+        if SVGBase._indexed:
+            self._report(self)
+
+    def _discard(self):
+        '''Discard the cached output and bounding box of this element and of
+        all its ancestors.'''
+
+        node = self
+        while node is not None and (node._cache is not None or
+                                    node._bounds is not None):
+            object.__setattr__(node, '_cache', None)
+            object.__setattr__(node, '_bounds', None)
+            node = node._parent
+
+    def _report(self, element):
+        '''Report a change to an element to the spatial indexes of this
+        element and of all its ancestors.
+
+        @param element: SVGBase
+            the element that changed or was added'''
+
+        node = self
+        while node is not None:
+            if node._index is not None:
+                node._index.changed(element)
+            node = node._parent
+
+    def clone(self):
+        '''Return a copy of this element and its subtree, without a parent,
+        that shares everything with the original until either side changes.
+        Making a clone costs about as much as copying the list of children of
+        this element, and changes to the clone or the original only copy the
+        elements on the path down to what changed, and their siblings.'''
+
+        SVGBase._cloned = True
+        return self._clone(None)
+
+    def _clone(self, parent):
+        '''Return a copy-on-write copy of this element, sharing its containers
+        and, until they are asked for, its children.
+
+        @param parent: SVGBase
+            the parent of the copy, or None'''
+
+        cls = type(self)
+        clone = cls.__new__(cls)
+
+        shared, transient = _slots(cls)
+        set_slot = object.__setattr__
+        get_slot = object.__getattribute__
+        for name in shared:
+            set_slot(clone, name, get_slot(self, name))
+        for name in transient:
+            set_slot(clone, name, None)
+
+        # the output and bounding box are the same until either side changes
+        set_slot(clone, '_parent', parent)
+        set_slot(clone, '_cache', self._cache)
+        set_slot(clone, '_bounds', self._bounds)
+
+        set_slot(clone, '_shared', True)
+        set_slot(self, '_shared', True)
+
+        children = self._children
+        if type(children) is SharedChildren:
+            shared = SharedChildren(children, children.owner, clone)
+            children.owner._register(shared)
+            object.__setattr__(clone, '_children', shared)
+        elif children and type(children) is not LazyChildren:
+            shared = SharedChildren(children, self, clone)
+            self._register(shared)
+            object.__setattr__(clone, '_children', shared)
+        elif type(children) is not LazyChildren:
+            # the unparsed contents of loaded elements are shared as they are
+            object.__setattr__(clone, '_children', None)
+
+        return clone
+
+    def _register(self, shared):
+        '''Note that a clone shares the children of this element, so that it
+        can be given its own copies of them before any of them changes.
+
+        @param shared: SharedChildren
+            the children of the clone'''
+
+        clones = self._clones
+        if clones is None:
+            clones = []
+            object.__setattr__(self, '_clones', clones)
+        elif not len(clones) % self.PURGE_CLONES:
+            clones[:] = [ref for ref in clones if ref() is not None]
+
+        clones.append(weakref.ref(shared))
+
+    def _materialize(self):
+        '''Replace the shared children of this clone by clones of them, and
+        return the new list of children.'''
+
+        children = [child._clone(self) for child in self._children]
+        object.__setattr__(self, '_children', children)
+        return children
+
+    def _release(self):
+        '''Give every clone still sharing the children of this element clones
+        of its own.'''
+
+        clones = self._clones
+        object.__setattr__(self, '_clones', None)
+
+        for ref in clones:
+            shared = ref()
+            if shared is not None and shared.holder._children is shared:
+                shared.holder._materialize()
+
+    def _own(self):
+        '''Prepare this element to be changed, once clones have been made.
+        Clones sharing the children of any of its ancestors are given their
+        own copies of the path down to this element, and the containers of
+        this element are copied if it shares them with a clone.'''
+
+        ancestors = []
+        node = self._parent
+        while node is not None:
+            ancestors.append(node)
+            node = node._parent
+
+        # from the top down, so that each level releases the clones made by
+        # releasing the one above
+        for node in reversed(ancestors):
+            if node._clones:
+                node._release()
+
+        if self._shared:
+            object.__setattr__(self, '_shared', False)
+            self._unshare()
+
+    def _unshare(self):
+        '''Replace the containers of this element, which are shared with a
+        clone, by copies of them. Subclasses holding other mutable state
+        extend this.'''
+
+        object.__setattr__(self, 'attributes', Attrs(self.attributes))
+
+        meta = self._meta
+        if meta is not None:
+            object.__setattr__(self, '_meta', Attrs(meta))
+
+        transform = self._transform
+        if transform is not None:
+            object.__setattr__(self, '_transform', list(transform))
 
     def add_child(self, child):
         '''Add an SVG element to this one as a child element.
@@ -71,7 +425,31 @@ class SVGBase(object):
         @param child: SVGBase
             the SVG element to add as a child'''
 
-        object.__getattribute__(self, 'children').append(child)
+        if SVGBase._cloned:
+            self._own()
+
+        self.children.append(child)
+        object.__setattr__(child, '_parent', self)
+
+        # only the new child needs filing in any spatial index above
+        self._discard()
+        if SVGBase._indexed:
+            self._report(child)
+
+    def _add_transform(self, text, matrix):
+        '''Append a transformation to this element, both to the list written
+        out as it was built and to the composed matrix, and return a reference
+        to the element.
+
+        @param text: str
+            the transformation, formatted as SVG
+        @param matrix: tuple
+            the transformation, as an affine matrix'''
+
+        self.transform.append(text)
+        object.__setattr__(self, '_matrix', affine.multiply(self._matrix, matrix))
+        self.invalidate()
+        return self
 
     def matrix(self, a, b, c, d, e, f):
         '''Create a group with a matrix transformation, add it to the DOM and
@@ -94,9 +472,9 @@ class SVGBase(object):
         @param f: float
             the y-translation factor'''
 
-        transform = object.__getattribute__(self, 'transform')
-        transform.append('matrix({}, {}, {}, {}, {}, {})'.format(a, b, c, d, e, f))
-        return self
+        return self._add_transform(
+            'matrix({}, {}, {}, {}, {}, {})'.format(a, b, c, d, e, f),
+            (a, b, c, d, e, f))
 
     def translate(self, tx, ty):
         '''Create a group with a translation tranformation, add it to the DOM
@@ -107,9 +485,9 @@ class SVGBase(object):
         @param ty: float
             the y translation'''
 
-        transform = object.__getattribute__(self, 'transform')
-        transform.append('translate({} {})'.format(tx, ty))
-        return self
+        return self._add_transform(
+            'translate({} {})'.format(tx, ty),
+            affine.translation(tx, ty))
 
     def scale(self, sx, sy):
         '''Create a group with a scaling tranformation, add it to the DOM and 
@@ -120,9 +498,9 @@ class SVGBase(object):
         @param sy: float
             the y scaling factor'''
 
-        transform = object.__getattribute__(self, 'transform')
-        transform.append('scale({} {})'.format(sx, sy))
-        return self
+        return self._add_transform(
+            'scale({} {})'.format(sx, sy),
+            affine.scaling(sx, sy))
 
     def rotate(self, theta, cx=0.0, cy=0.0):
         '''Create a group with a rotation transformation, add it to the DOM and
@@ -135,9 +513,9 @@ class SVGBase(object):
         @param cy: optional, float
             the y-center of rotation, defaults to 0'''
 
-        transform = object.__getattribute__(self, 'transform')
-        transform.append('rotate({}, {}, {})'.format(theta, cx, cy))
-        return self
+        return self._add_transform(
+            'rotate({}, {}, {})'.format(theta, cx, cy),
+            affine.rotation(theta, cx, cy))
 
     def skew_x(self, theta):
         '''Skew in the x direction.
@@ -145,9 +523,9 @@ class SVGBase(object):
         @param theta: float
             the angle, in degrees, of the skew'''
 
-        transform = object.__getattribute__(self, 'transform')
-        transform.append('skewX({})'.format(theta))
-        return self
+        return self._add_transform(
+            'skewX({})'.format(theta),
+            affine.skewing_x(theta))
 
     def skew_y(self, theta):
         '''Skew in the y direction.
@@ -155,83 +533,614 @@ class SVGBase(object):
         @param theta: float
             the angle, in degrees, of the skew'''
 
-        transform = object.__getattribute__(self, 'transform')
-        transform.append('skewY({})'.format(theta))
-        return self
+        return self._add_transform(
+            'skewY({})'.format(theta),
+            affine.skewing_y(theta))
+
+    def local_bbox(self):
+        '''Return the bounding box of this element's geometry in its own
+        coordinate system, before its transformation, as an (xmin, ymin, xmax,
+        ymax) tuple, or None if it is not known. This base implementation
+        knows nothing of the geometry, and returns None.'''
+
+        return None
+
+    def bbox(self):
+        '''Return the bounding box of this element in the coordinate system of
+        its parent, taking its transformation into account, as an (xmin, ymin,
+        xmax, ymax) tuple, or None if it is not known. The box is kept until
+        the element, or anything below it, is changed.'''
+
+        box = self._bounds
+        if box is None:
+            box = self.local_bbox()
+            if box is None:
+                box = False
+            else:
+                box = bounds.transform(self._matrix, box)
+            object.__setattr__(self, '_bounds', box)
+
+        return box or None
+
+    def _stroke_width(self):
+        '''Return the stroke width in effect on this element, set on it or
+        inherited from its nearest ancestor setting one, or None if that
+        width is not a plain number.'''
+
+        node = self
+        while node is not None:
+            width = node.attributes.get('stroke-width')
+            if width is not None:
+                return _number(width)
+            node = node._parent
+
+        return 1.0
+
+    def _text(self, values=_PLAIN):
+        '''Return the text content of this element as a string, with numbers
+        and other values formatted by a serializer.
+
+        @param values: optional, Serializer
+            the formatting of values that are not strings'''
+
+        content = self.content
+        if content is None:
+            return ''
+        if isinstance(content, basestring):
+            return content
+        return values.plain(content)
+
+    def viewport(self):
+        '''Return the visible area of this element, as an (xmin, ymin, xmax,
+        ymax) tuple in its own coordinate system, or None if it does not
+        define one. Only canvases do.'''
+
+        return None
 
     def defaults(self):
         '''Return default values for this SVG element.'''
 
-        load_defaults = object.__getattribute__(self, 'load_defaults')
+        load_defaults = self.load_defaults
 
         if load_defaults:
             yield 'fill', 'none'
             yield 'stroke', '#000'
 
+    def bake(self, matrix, attributes):
+        '''Apply a transformation to the rendered attributes of this element in
+        place, instead of writing it out as a transform attribute. Returns
+        whether that could be done exactly - elements that cannot bake a given
+        transformation leave the attributes untouched and return False. This
+        base implementation never bakes.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this element'''
+
+        return False
+
+    def _bake_stroke(self, attributes, scale):
+        '''Scale the stroke width in the rendered attributes for geometry baked
+        under a uniform scaling, so that the stroke looks the same as it would
+        under the transformation. Returns whether that could be done.
+
+        @param attributes: dict
+            the rendered attributes of this element
+        @param scale: float
+            the uniform scaling factor of the transformation'''
+
+        if abs(scale - 1.0) < affine.EPSILON:
+            return True
+
+        if 'stroke-dasharray' in attributes:
+            return False
+
+        # a width inherited from an ancestor is scaled here as well
+        if 'stroke-width' in attributes:
+            width = _number(attributes['stroke-width'])
+        else:
+            width = self._stroke_width()
+        if width is None:
+            return False
+
+        attributes['stroke-width'] = width * scale
+        return True
+
+    def _render_transform(self, attributes, options, inherited):
+        '''Add the transformation of this element to its rendered attributes,
+        in the form selected by the render options.
+
+        @param attributes: dict
+            the rendered attributes of this element
+        @param options: RenderOptions
+            the settings of the render
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None'''
 
-    def render_attributes(self):
+        if options is None or options.transforms == 'keep':
+            transform = self._transform
+            if transform:
+                attributes['transform'] = ' '.join(transform)
+            return
+
+        matrix = affine.multiply(inherited, self._matrix)
+        if matrix is None:
+            return
+
+        if options.transforms == 'bake' and self.bake(matrix, attributes):
+            return
+
+        attributes['transform'] = affine.render(matrix, options.values.number)
+
+    def render_attributes(self, options=None, inherited=None):
         '''Return the attributes and meta-attributes for this SVG element, 
-        string-formatted for insertion into an XML tag.'''
+        string-formatted for insertion into an XML tag.
+
+        @param options: optional, RenderOptions
+            the settings of the render
+        @param inherited: optional, tuple
+            the transformation pushed down from baked ancestors'''
+
+        instrument = options.instrument if options is not None else None
+        if instrument is not None:
+            return instrument.render_attributes(self, options, inherited)
+
+        attributes = self._assemble_attributes(options, inherited)
+
+        # perform any subclass-defined transformations on the attribute data
+        self._run_renderers(attributes, options)
+
+        if options is None:
+            values = _PLAIN
+        else:
+            values = options.values
+
+            # replace common presentation attributes with a class
+            if options.styles is not None:
+                options.styles.apply(attributes)
+
+        return ' '.join(['%s="%s"' % (name, values(value))
+                         for name, value in attributes.iteritems()])
+
+    def _assemble_attributes(self, options, inherited):
+        '''Return the attributes to write out for this SVG element, as a dict
+        of unformatted values, merging the meta-attributes, defaults,
+        attributes and transformation. This and _run_renderers are the steps
+        of render_attributes.
+
+        @param options: RenderOptions
+            the settings of the render, or None
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None'''
 
         # set the attributes to the meta
-        attributes = dict(self.meta)
+        meta = self._meta
+        attributes = dict(meta) if meta else dict()
 
         # apply default values if they have not been supplied
         for key, value in self.defaults():
             attributes[key] = value
 
-        # create a dict of the base attributes
-        base_attributes = dict(object.__getattribute__(self, 'attributes'))
-
-        # perform any subclass-defined transformations on the attribute data
-        try:
-            renderers = object.__getattribute__(self, 'RENDERERS')
-            for name in base_attributes:
-                if name in renderers:
-                    value = base_attributes[name]
-                    base_attributes[name] = renderers[name](value)
-        except AttributeError:
-            pass
-
         # update the attributes so far with the base attributes, allowing any 
         # meta attributes with the same keys as base attributes to be clobbered
-        attributes.update(base_attributes)
+        attributes.update(dict(self.attributes))
 
         # incorporate the transform into the attributes
-        transform = object.__getattribute__(self, 'transform')
-        if transform:
-            attributes['transform'] = ' '.join(transform)
+        self._render_transform(attributes, options, inherited)
 
-        return ' '.join('{}="{}"'.format(*kv) for kv in attributes.iteritems())
+        return attributes
+
+    def _run_renderers(self, attributes, options):
+        '''Format the attribute values that this class has a renderer for,
+        in place.
+
+        @param attributes: dict
+            the attributes to write out
+        @param options: RenderOptions
+            the settings of the render, or None'''
+
+        renderers = self.RENDERERS
+        if renderers:
+            for name in renderers:
+                if name in attributes:
+                    attributes[name] = renderers[name](attributes[name], options)
+
+    def iter_render(self, pretty=False, level=0, **options):
+        '''Render the XML for this SVG object as a series of string chunks.
+        Tag openings, attributes and closings are yielded depth-first, so the
+        document never has to be held in memory as a whole. Joining the
+        chunks gives exactly the output of render().
 
-    def render(self, pretty=False, level=0):
-        '''Render the XML for this SVG object.
-        
         @param pretty: optional, bool
             a flag controlling pretty printing - pretty printing will perform
             indentations based on nesting level
         @param level: int
-            the level of nesting this element is at'''
+            the level of nesting this element is at
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        options = self.render_options(pretty, **options)
+        return self._iter(options, level, None, None)
+
+    def render_options(self, pretty=False, **options):
+        '''Return the settings for a render starting from this SVG object.
+
+        @param pretty: optional, bool
+            a flag controlling pretty printing
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        options = RenderOptions(pretty=pretty, **options)
+
+        if options.cull is True:
+            options.cull = self.viewport()
+            if options.cull is None:
+                raise ValueError('cull=True needs an element with a viewport, '
+                                 'such as a canvas - give a rectangle instead')
+
+        if options.stylesheet:
+            options.styles = Stylesheet(self, options.values)
+
+        if options.dedupe:
+            options.symbols = Symbols(self, options)
+
+        return options
+
+    def _iter(self, options, level, inherited, ctm):
+        '''Return an iterator over the chunks of the rendered XML for this SVG
+        object, taking its output from the cache if caching is on.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        if options.instrument is not None:
+            return options.instrument.iter(self, options, level, inherited, ctm)
+
+        if options.cache:
+            return self._iter_cached(options, level, inherited, ctm)
+
+        return self._iter_render(options, level, inherited, ctm)
+
+    def _iter_chunks(self, options, level, inherited, ctm):
+        '''Return an iterator over the chunks of the rendered XML for this SVG
+        object, from the cache or not, as _iter does when no instrument is
+        watching the render. Instruments call this to get the output they
+        count.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        if options.cache:
+            return self._iter_cached(options, level, inherited, ctm)
+
+        return self._iter_render(options, level, inherited, ctm)
+
+    def _iter_cached(self, options, level, inherited, ctm):
+        '''Yield the rendered XML for this SVG object, in one chunk from the
+        cache if it holds output rendered with the same settings, or chunk by
+        chunk as it is rendered otherwise, caching the result once the last
+        chunk has been taken.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        key = (options.key, level, inherited, ctm)
+
+        cached = self._cache
+        if cached is not None and cached[0] == key and cached[1] is not None:
+            yield cached[1]
+            return
+
+        # marks the render in progress, so that changes made before it ends,
+        # which discard the mark, keep its output from being cached
+        pending = (key, None)
+        object.__setattr__(self, '_cache', pending)
+
+        chunks = []
+        for chunk in self._iter_render(options, level, inherited, ctm):
+            chunks.append(chunk)
+            yield chunk
+
+        if self._cache is pending:
+            object.__setattr__(self, '_cache', (key, ''.join(chunks)))
+
+    def _iter_render(self, options, level, inherited, ctm):
+        '''Yield the chunks of the rendered XML for this SVG object. This does
+        the work of iter_render, and is what subclasses with their own output
+        format override.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
 
-        padding = '' if not pretty else ' ' * (2 * level)
+        head, tail, children, inherited, ctm = self._render_parts(
+            options, level, inherited, ctm)
+
+        yield head
+        if tail is None:
+            return
+
+        # the stylesheet and repeated groups come before anything else
+        styles = options.styles
+        symbols = options.symbols
+        defs = symbols is not None and symbols.root is self and symbols.defs
+
+        if styles is not None and styles.root is self and styles.classes:
+            yield styles.render(options.pretty, level + 1)
+            if children or defs:
+                yield '\n'
+
+        if defs:
+            for chunk in symbols.iter_defs(options, level + 1):
+                yield chunk
+            if children:
+                yield '\n'
+
+        for i, child in enumerate(children):
+            if i:
+                yield '\n'
+
+            for chunk in child._iter(options, level + 1, inherited, ctm):
+                yield chunk
+
+        yield tail
+
+    def _render_parts(self, options, level, inherited, ctm):
+        '''Split the rendered XML for this SVG object into the parts around
+        its children: the opening text, the closing text, the children to
+        render in between, separated by newlines, and the inherited
+        transformation and ctm to render them with. The closing text is None
+        if the element has no content or children, and the opening text is
+        then all there is.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        # repeated groups are replaced by references to their definition
+        symbols = options.symbols
+        if symbols is not None and id(self) in symbols.ids:
+            use = symbols.render_use(self, level, inherited)
+            return use, None, (), inherited, ctm
+
+        padding = '' if not options.pretty else ' ' * (2 * level)
 
         tag = self.TAG
-        attributes = self.render_attributes()
+        attributes = self.render_attributes(options, inherited)
+        if attributes:
+            attributes = ' ' + attributes
 
-        children = object.__getattribute__(self, 'children')
-        if self.content or children:
-            children = '\n'.join(c.render(pretty=pretty, level=level+1) for c in children)
+        if (symbols is not None and symbols.root is self and symbols.defs and
+                'xmlns:xlink' not in self.attributes):
+            attributes += ' xmlns:xlink="{}"'.format(XLINK)
 
-            xml = '<{tag} {attributes}>\n{content}\n{children}\n{padding}</{tag}>'.format(
-                tag=tag, 
-                attributes=attributes, 
-                content=self.content,
-                children=children, 
-                padding=padding)
+        children = self._children
+        if type(children) is LazyChildren:
+            # the unparsed contents of a loaded element are written out as
+            # they were read, unless transformations are pushed into them
+            if options.transforms == 'bake':
+                children = self.children
+            else:
+                head = '{padding}<{tag}{attributes}>{raw}</{tag}>'.format(
+                    padding=padding,
+                    tag=tag,
+                    attributes=attributes,
+                    raw=children.raw)
+                return head, None, (), inherited, ctm
 
-        else:
-            xml = '<{tag} {attributes} />'.format(tag=tag, attributes=attributes)
+        if not (self.content or children):
+            head = '{padding}<{tag}{attributes} />'.format(
+                padding=padding, tag=tag, attributes=attributes)
+            return head, None, (), inherited, ctm
+
+        head = '{padding}<{tag}{attributes}>\n{content}\n'.format(
+            padding=padding,
+            tag=tag,
+            attributes=attributes,
+            content=escape_text(self._text(options.values)))
+        tail = '\n{padding}</{tag}>'.format(padding=padding, tag=tag)
 
-        return padding + xml
+        # when baking, transformations are pushed down to the children
+        if options.transforms == 'bake':
+            inherited = affine.multiply(inherited, self._matrix)
+
+        # when culling, children entirely outside the visible area are left
+        # out
+        children = children or ()
+        cull = options.cull
+        if cull is not None:
+            ctm = affine.multiply(ctm, self._matrix)
+            width = self._stroke_width()
+            children = [child for child in children
+                        if not _outside(child, cull, ctm, width)]
+
+        return head, tail, children, inherited, ctm
+
+    def write_to(self, fileobj, pretty=False, **options):
+        '''Stream the XML for this SVG object to a file-like object, chunk by
+        chunk, without building the whole document in memory.
+
+        @param fileobj: file
+            any object with a write method accepting strings
+        @param pretty: optional, bool
+            a flag controlling pretty printing - pretty printing will perform
+            indentations based on nesting level
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        write = fileobj.write
+        for chunk in self.iter_render(pretty=pretty, **options):
+            write(chunk)
+
+    def iter_chunks(self, chunk_size=65536, pretty=False, **options):
+        '''Render the XML for this SVG object as a series of string chunks of
+        exactly chunk_size characters, apart from the last, which may be
+        shorter. Rendering only advances as chunks are taken, so each chunk
+        costs a bounded amount of work, also when caching is on, since output
+        missing from the cache is rendered as it is taken.
+
+        The unit of work is the opening tag of a single element, with all of
+        its attributes: an element holding a great deal of data in one
+        attribute, such as a path or polyline with millions of points, is
+        formatted in one step however small the chunks. Marker batches are
+        formatted a block at a time.
+
+        This is the building block for serving documents from an event loop
+        without stalling it: write one chunk, wait for the writer to drain,
+        and let the loop run other tasks before taking the next.
+
+        @param chunk_size: optional, int
+            the number of characters in each chunk
+        @param pretty: optional, bool
+            a flag controlling pretty printing - pretty printing will perform
+            indentations based on nesting level
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+
+        pending = []
+        size = 0
+        for chunk in self.iter_render(pretty=pretty, **options):
+            pending.append(chunk)
+            size += len(chunk)
+            if size < chunk_size:
+                continue
+
+            data = ''.join(pending)
+            end = len(data) - len(data) % chunk_size
+            for start in xrange(0, end, chunk_size):
+                yield data[start:start+chunk_size]
+
+            pending = [data[end:]]
+            size = len(pending[0])
+
+        if size:
+            yield ''.join(pending)
+
+    def render(self, pretty=False, level=0, **options):
+        '''Render the XML for this SVG object.
         
+        @param pretty: optional, bool
+            a flag controlling pretty printing - pretty printing will perform
+            indentations based on nesting level
+        @param level: int
+            the level of nesting this element is at
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        return ''.join(self.iter_render(pretty=pretty, level=level, **options))
+
+def _slots(cls):
+    '''Return the names of the slots of a class of element, as the slots
+    clones share with their original and the transient ones.
+
+    @param cls: type
+        a subclass of SVGBase'''
+
+    slots = _SLOTS.get(cls)
+    if slots is None:
+        names = [name for klass in cls.__mro__
+                 for name in klass.__dict__.get('__slots__', ())]
+        transient = cls.TRANSIENT
+        slots = _SLOTS[cls] = (
+            tuple(name for name in names if name not in transient),
+            tuple(name for name in names if name in transient))
+    return slots
+
+def _fields(cls):
+    '''Return the names of the public slots of a class of element, which
+    attribute assignment sets rather than storing an SVG attribute.
+
+    @param cls: type
+        a subclass of SVGBase'''
+
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        fields = _FIELDS[cls] = frozenset(
+            name for klass in cls.__mro__
+            for name in klass.__dict__.get('__slots__', ())
+            if not name.startswith('_'))
+    return fields
+
+def _number(value):
+    '''Return an attribute value as a float, or None if it is not a plain
+    number, such as a length with units or a percentage.
+
+    @param value: object
+        the attribute value'''
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _outside(child, cull, ctm, width):
+    '''Return whether a child's bounding box, padded by half its stroke
+    width, lies entirely outside the culling rectangle. Children whose box or
+    stroke width is not known are never outside.
+
+    @param child: SVGBase
+        the child
+    @param cull: tuple
+        the culling rectangle, as a bounding box
+    @param ctm: tuple
+        the transformation from the parent's coordinates to those of the
+        culling rectangle
+    @param width: float
+        the stroke width in effect on the parent, or None if not known'''
+
+    box = child.bbox()
+    if box is None:
+        return False
+
+    value = child.attributes.get('stroke-width')
+    if value is not None:
+        width = _number(value)
+    if width is None:
+        return False
+
+    # the stroke is drawn in the child's user space, so its half width is
+    # taken through the child's transformation
+    if width:
+        half = abs(width) / 2.0
+        matrix = child._matrix or affine.IDENTITY
+        box = bounds.pad(box, half * (abs(matrix[0]) + abs(matrix[2])),
+                         half * (abs(matrix[1]) + abs(matrix[3])))
 
+    return not bounds.intersects(cull, bounds.transform(ctm, box))
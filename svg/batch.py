@@ -0,0 +1,218 @@
+from array import array
+from itertools import izip
+
+import bounds
+from base import SVGBase
+
+def _tolist(values):
+    '''Convert a slice of a column to a list of Python numbers, which is much
+    faster to format than indexing arrays element by element.
+
+    @param values: sequence
+        the values to convert'''
+
+    try:
+        return values.tolist()
+    except AttributeError:
+        return list(values)
+
+class MarkerBatch(SVGBase):
+    '''A columnar batch of identical SVG elements that differ only in their
+    geometry, such as the markers of a scatter plot. The geometry is held as
+    one array per attribute rather than one Python object per element, and
+    the individual tags are only formatted, a block at a time, when the batch
+    is rendered.
+
+    Subclasses set TAG and COLUMNS, the names of the geometry attributes in
+    the order they are passed to the constructor.'''
+
+    __slots__ = ('columns', 'length')
+
+    COLUMNS = ()
+
+    # the number of elements formatted and yielded as a single chunk
+    BLOCK_SIZE = 4096
+
+    # the number format the serializer writes geometry with when neither
+    # precision nor snapping is set, used to format whole blocks at once
+    NUMBER_FORMAT = '%.12g'
+
+    def __init__(self, *args, **kwargs):
+        '''Create the batch. Each geometry argument may either be a sequence,
+        giving one value per element, or a single number shared by all of
+        them. Lists and tuples are packed into arrays of doubles, while arrays
+        and NumPy arrays are held as they are, without copying.
+
+        @param args: positional parameters
+            the geometry columns, in the order given by COLUMNS
+        @param kwargs: keyword parameters
+            presentation attributes shared by every element in the batch'''
+
+        if len(args) != len(self.COLUMNS):
+            raise TypeError('{} takes {} geometry arguments ({} given)'.format(
+                type(self).__name__, len(self.COLUMNS), len(args)))
+
+        columns = []
+        length = None
+        for name, values in zip(self.COLUMNS, args):
+            if isinstance(values, basestring) or not hasattr(values, '__len__'):
+                kwargs[name] = values
+                continue
+
+            if isinstance(values, (list, tuple)):
+                values = array('d', values)
+
+            if length is None:
+                length = len(values)
+            elif len(values) != length:
+                raise ValueError('all geometry columns must be of the same length')
+
+            columns.append((name, values))
+
+        super(MarkerBatch, self).__init__(**kwargs)
+
+        object.__setattr__(self, 'columns', columns)
+        object.__setattr__(self, 'length', length or 0)
+
+    def __len__(self):
+        '''Return the number of elements in the batch.'''
+
+        return self.length
+
+    def _extent(self, name):
+        '''Return the smallest and largest value of a geometry attribute
+        across the batch, or None if it is not numeric.
+
+        @param name: str
+            the name of the attribute'''
+
+        for column, values in self.columns:
+            if column == name:
+                values = _tolist(values)
+                return (min(values), max(values)) if values else None
+
+        try:
+            value = float(self.attributes[name])
+        except (KeyError, ValueError):
+            return None
+        return (value, value)
+
+    def _iter_render(self, options, level, inherited, ctm):
+        '''Render the XML for every element in the batch, yielding one chunk
+        per block of elements.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            unused, batches are culled as a whole'''
+
+        padding = '' if not options.pretty else ' ' * (2 * level)
+
+        columns = self.columns
+        length = self.length
+
+        # numbers are formatted by the template when the serializer would
+        # write them exactly, and by the serializer otherwise
+        values = options.values
+        number = None if values.exact else values.number
+        number_format = self.NUMBER_FORMAT if number is None else '%s'
+
+        # build a single format string for an element, with the shared
+        # attributes already filled in
+        fields = ['{}="{}"'.format(name, number_format) for name, _ in columns]
+        attributes = self.render_attributes(options, inherited)
+        if attributes:
+            fields.append(attributes.replace('%', '%%'))
+
+        template = '{}<{} {} />'.format(padding, self.TAG, ' '.join(fields))
+
+        if not columns:
+            yield template
+            return
+
+        step = self.BLOCK_SIZE
+        for start in xrange(0, length, step):
+            block = [_tolist(values[start:start+step]) for _, values in columns]
+            if number is not None:
+                block = [[number(value) for value in column] for column in block]
+
+            chunk = '\n'.join(template % row for row in izip(*block))
+            if number is None:
+                # the serializer writes negative zero as zero
+                chunk = chunk.replace('="-0"', '="0"')
+            yield chunk if not start else '\n' + chunk
+
+class Circles(MarkerBatch):
+    '''A batch of SVG circles.'''
+
+    __slots__ = ()
+
+    TAG = 'circle'
+
+    COLUMNS = ('cx', 'cy', 'r')
+
+    def __init__(self, cx, cy, r, **kwargs):
+        '''Create the batch of circles.
+
+        @param cx: sequence or float
+            the x coordinates of the centers of the circles
+        @param cy: sequence or float
+            the y coordinates of the centers of the circles
+        @param r: sequence or float
+            the radii of the circles
+        @param kwargs: keyword parameters
+            additional metadata shared by all of the circles'''
+
+        super(Circles, self).__init__(cx, cy, r, **kwargs)
+
+    def local_bbox(self):
+        '''Return the bounding box of the batch, found from the extremes of
+        each column, or None if it is empty or not numeric.'''
+
+        extents = [self._extent(name) for name in self.COLUMNS]
+        if None in extents:
+            return None
+
+        (xmin, xmax), (ymin, ymax), (_, r) = extents
+        return (xmin - r, ymin - r, xmax + r, ymax + r)
+
+class Rects(MarkerBatch):
+    '''A batch of SVG rects.'''
+
+    __slots__ = ()
+
+    TAG = 'rect'
+
+    COLUMNS = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height, **kwargs):
+        '''Create the batch of rects.
+
+        @param x: sequence or float
+            the x coordinates of the corners closest to the origin
+        @param y: sequence or float
+            the y coordinates of the corners closest to the origin
+        @param width: sequence or float
+            the widths of the rectangles
+        @param height: sequence or float
+            the heights of the rectangles
+        @param kwargs: keyword parameters
+            additional metadata shared by all of the rects'''
+
+        super(Rects, self).__init__(x, y, width, height, **kwargs)
+
+    def local_bbox(self):
+        '''Return the bounding box of the batch, found from the extremes of
+        each column, or None if it is empty or not numeric. Negative sizes
+        are not allowed in SVG, so they are not accounted for.'''
+
+        extents = [self._extent(name) for name in self.COLUMNS]
+        if None in extents:
+            return None
+
+        (xmin, xmax), (ymin, ymax), (_, width), (_, height) = extents
+        return (xmin, ymin, xmax + width, ymax + height)
@@ -0,0 +1,199 @@
+'''Axis-aligned bounding boxes, stored as (xmin, ymin, xmax, ymax) tuples.'''
+
+import math
+
+import affine
+
+def from_points(xs, ys):
+    '''Return the box enclosing a set of points, or None if there are none.
+
+    @param xs: sequence
+        the x-coordinates of the points
+    @param ys: sequence
+        the y-coordinates of the points'''
+
+    if not len(xs):
+        return None
+
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def union(boxes):
+    '''Return the box enclosing all of the given boxes, or None if there are
+    none.
+
+    @param boxes: iterable
+        the boxes to enclose'''
+
+    boxes = list(boxes)
+    if not boxes:
+        return None
+
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+def transform(matrix, box):
+    '''Return the box enclosing another box after an affine transformation.
+    Under rotation and skew this is larger than the box of the transformed
+    geometry itself, but never smaller.
+
+    @param matrix: tuple
+        the transformation, as an affine matrix, or None
+    @param box: tuple
+        the box to transform'''
+
+    if matrix is None:
+        return box
+
+    xmin, ymin, xmax, ymax = box
+    corners = [affine.apply(matrix, x, y)
+               for x, y in ((xmin, ymin), (xmax, ymin), (xmin, ymax), (xmax, ymax))]
+
+    return from_points([x for x, _ in corners], [y for _, y in corners])
+
+def intersects(box1, box2):
+    '''Return whether two boxes overlap, counting shared edges as overlap.
+
+    @param box1: tuple
+        the first box
+    @param box2: tuple
+        the second box'''
+
+    return (box1[0] <= box2[2] and box2[0] <= box1[2] and
+            box1[1] <= box2[3] and box2[1] <= box1[3])
+
+def pad(box, dx, dy):
+    '''Return a box grown by a margin on each side.
+
+    @param box: tuple
+        the box
+    @param dx: float
+        the margin added on the left and right
+    @param dy: float
+        the margin added at the top and bottom'''
+
+    return (box[0] - dx, box[1] - dy, box[2] + dx, box[3] + dy)
+
+def contains(box, x, y):
+    '''Return whether a point lies inside a box, counting its edges.
+
+    @param box: tuple
+        the box
+    @param x: float
+        the x-coordinate of the point
+    @param y: float
+        the y-coordinate of the point'''
+
+    return box[0] <= x <= box[2] and box[1] <= y <= box[3]
+
+def cubic_extrema(p0, p1, p2, p3):
+    '''Return the values a cubic Bezier curve takes along one axis at its
+    ends and at its turning points, whose minimum and maximum bound the curve
+    along that axis.
+
+    @param p0: float
+        the coordinate of the start point
+    @param p1: float
+        the coordinate of the first control point
+    @param p2: float
+        the coordinate of the second control point
+    @param p3: float
+        the coordinate of the end point'''
+
+    values = [p0, p3]
+
+    # the roots of the derivative, a quadratic, divided through by 3
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+
+    if abs(a) < 1e-12:
+        roots = [-c / b] if abs(b) > 1e-12 else []
+    else:
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            roots = []
+        else:
+            root = math.sqrt(discriminant)
+            roots = [(-b + root) / (2 * a), (-b - root) / (2 * a)]
+
+    for t in roots:
+        if 0 < t < 1:
+            u = 1 - t
+            values.append(u * u * u * p0 + 3 * u * u * t * p1 +
+                          3 * u * t * t * p2 + t * t * t * p3)
+
+    return values
+
+def arc(start, rx, ry, phi, large, sweep, x, y):
+    '''Return the box enclosing an SVG elliptical arc, given in endpoint form
+    as in the 'A' path command. Out of range radii are scaled up as the SVG
+    specification requires.
+
+    @param start: tuple
+        the point the arc starts from
+    @param rx: float
+        the x-radius of the ellipse
+    @param ry: float
+        the y-radius of the ellipse
+    @param phi: float
+        the rotation of the ellipse, in degrees
+    @param large: int
+        1 to take the larger of the possible arcs, 0 for the smaller
+    @param sweep: int
+        1 to draw in the direction of increasing angle, 0 otherwise
+    @param x: float
+        the x-coordinate of the end point
+    @param y: float
+        the y-coordinate of the end point'''
+
+    x0, y0 = start
+    rx, ry = abs(rx), abs(ry)
+
+    # degenerate arcs are drawn as straight lines, or not at all
+    if not rx or not ry or (x0, y0) == (x, y):
+        return from_points([x0, x], [y0, y])
+
+    # convert to center form, following the implementation notes of the SVG
+    # specification
+    cos, sin = math.cos(math.radians(phi)), math.sin(math.radians(phi))
+    hx, hy = (x0 - x) / 2.0, (y0 - y) / 2.0
+    x1 = cos * hx + sin * hy
+    y1 = -sin * hx + cos * hy
+
+    scale = (x1 * x1) / (rx * rx) + (y1 * y1) / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+
+    numerator = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    denominator = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    coefficient = math.sqrt(max(0.0, numerator / denominator))
+    if bool(large) == bool(sweep):
+        coefficient = -coefficient
+
+    ccx = coefficient * rx * y1 / ry
+    ccy = -coefficient * ry * x1 / rx
+    cx = cos * ccx - sin * ccy + (x0 + x) / 2.0
+    cy = sin * ccx + cos * ccy + (y0 + y) / 2.0
+
+    theta = math.atan2((y1 - ccy) / ry, (x1 - ccx) / rx)
+    delta = math.atan2((-y1 - ccy) / ry, (-x1 - ccx) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    # the parameters at which the ellipse reaches its extremes along each
+    # axis, kept if the arc passes through them
+    xs, ys = [x0, x], [y0, y]
+    tx = math.atan2(-ry * sin, rx * cos)
+    ty = math.atan2(ry * cos, rx * sin)
+    for t in (tx, tx + math.pi, ty, ty + math.pi):
+        if delta > 0:
+            inside = (t - theta) % (2 * math.pi) <= delta
+        else:
+            inside = (theta - t) % (2 * math.pi) <= -delta
+        if inside:
+            xs.append(cx + rx * cos * math.cos(t) - ry * sin * math.sin(t))
+            ys.append(cy + rx * sin * math.cos(t) + ry * cos * math.sin(t))
+
+    return from_points(xs, ys)
@@ -1,10 +1,21 @@
+import gzip
+import io
+
+from attrs import Attribute
+from dedupe import XLINK
+from defs import Defs
 from group import Group
 
 class Canvas(Group):
     '''The container for all SVG elements.'''
 
+    __slots__ = ()
+
     TAG = 'svg'
 
+    width = Attribute('width')
+    height = Attribute('height')
+
     def __init__(self, width, height, **kwargs):
         '''Create the canvas.
 
@@ -25,6 +36,56 @@ class Canvas(Group):
             version='1.1',
             **kwargs)
 
+    def viewport(self):
+        '''Return the visible area of the canvas, from its viewbox, or from
+        its width and height if the viewbox cannot be read.'''
+
+        # loaded documents spell the attribute as the specification does
+        attributes = self.attributes
+        viewbox = attributes.get('viewbox') or attributes.get('viewBox')
+
+        try:
+            x, y, width, height = [float(v) for v in
+                                   viewbox.replace(',', ' ').split()]
+        except (AttributeError, ValueError):
+            x, y = 0.0, 0.0
+            width, height = float(self.width), float(self.height)
+
+        return (x, y, x + width, y + height)
+
+    def define(self, group, id=None):
+        '''Define a group as a symbol, to be drawn any number of times with
+        Group.use, and return it. Its contents are written out once, in a
+        <defs> element at the top of the canvas. The group should not also be
+        part of the drawing.
+
+        @param group: Group
+            the group to define
+        @param id: optional, str
+            the id of the symbol - the group's own id if it has one, or a
+            generated one otherwise'''
+
+        children = self.children
+        if children and children[0].TAG == 'defs':
+            defs = children[0]
+        else:
+            defs = Defs()
+            children.insert(0, defs)
+            object.__setattr__(defs, '_parent', self)
+            self.invalidate()
+
+        if id is None:
+            id = group.attributes.get('id') or 'symbol{}'.format(
+                len(defs.children))
+
+        group.id = id
+        defs.add_child(group)
+
+        if 'xmlns:xlink' not in self.attributes:
+            self['xmlns:xlink'] = XLINK
+
+        return group
+
     def flip(self):
         '''Return a group that spans the entire canvas, but is flipped 
         vertically, add it to the DOM and return a reference to it.'''
@@ -35,15 +96,85 @@ class Canvas(Group):
 
         return group
 
-    def save(self, path, pretty=False):
-        '''Save this canvas to a file.
+    # the compression formats save can write
+    COMPRESSIONS = ('gzip',)
+
+    # the size of the chunks handed to the compressor
+    COMPRESS_CHUNK_SIZE = 65536
+
+    def save(self, path, pretty=False, compress=None, level=9, **options):
+        '''Save this canvas to a file. The output is streamed to disk as it is
+        rendered, so the document is never held in memory as a whole, and
+        when compressing it is passed through the compressor on the way.
 
         @param path: str
-            the path to the output file
+            the path to the output file - paths ending in '.svgz' are
+            compressed with gzip unless told otherwise
         @param pretty: optional, bool
             a flag controlling pretty printing - pretty printing will perform
-            indentations based on nesting level'''
-        
-        with open(path, 'w') as outfile:
-            outfile.write(self.render(pretty=pretty))
+            indentations based on nesting level
+        @param compress: optional, str
+            'gzip' to compress the output
+        @param level: optional, int
+            the compression level, from 1 (fastest) to 9 (smallest)
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        if compress is None and path.lower().endswith('.svgz'):
+            compress = 'gzip'
+
+        if compress is None:
+            with open(path, 'w') as outfile:
+                self.write_to(outfile, pretty=pretty, **options)
+            return
+
+        self._check_compression(compress)
+        with open(path, 'wb') as outfile:
+            self._write_gzip(outfile, pretty, level, options)
+
+    def render_gzip(self, pretty=False, level=9, **options):
+        '''Render this canvas compressed with gzip, and return the bytes, for
+        instance as the body of an HTTP response sent with
+        "Content-Encoding: gzip". Only the compressed output is held in
+        memory.
+
+        @param pretty: optional, bool
+            a flag controlling pretty printing
+        @param level: optional, int
+            the compression level, from 1 (fastest) to 9 (smallest)
+        @param options: keyword parameters
+            additional render settings - see RenderOptions'''
+
+        buf = io.BytesIO()
+        self._write_gzip(buf, pretty, level, options)
+        return buf.getvalue()
+
+    def _check_compression(self, compress):
+        '''Raise ValueError if a compression format is not supported.
+
+        @param compress: str
+            the compression format'''
+
+        if compress not in self.COMPRESSIONS:
+            raise ValueError('compress must be one of {}, not {!r}'.format(
+                ', '.join(self.COMPRESSIONS), compress))
+
+    def _write_gzip(self, fileobj, pretty, level, options):
+        '''Stream this canvas through a gzip compressor to a binary file-like
+        object. The modification time in the header is left at zero, so the
+        same canvas always compresses to the same bytes.
+
+        @param fileobj: file
+            the binary file-like object to write to
+        @param pretty: bool
+            a flag controlling pretty printing
+        @param level: int
+            the compression level
+        @param options: dict
+            additional render settings - see RenderOptions'''
 
+        with gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=level,
+                           mtime=0) as zipped:
+            for chunk in self.iter_chunks(self.COMPRESS_CHUNK_SIZE,
+                                          pretty=pretty, **options):
+                zipped.write(chunk)
@@ -1,10 +1,18 @@
+import affine
+from attrs import Attribute
 from base import SVGBase
 
 class Circle(SVGBase):
     '''An SVG circle.'''
 
+    __slots__ = ()
+
     TAG = 'circle'
 
+    cx = Attribute('cx')
+    cy = Attribute('cy')
+    r = Attribute('r')
+
     def __init__(self, cx, cy, r, **kwargs):
         '''Create the circle object, with additional metadata.
 
@@ -19,3 +27,39 @@ class Circle(SVGBase):
 
         super(Circle, self).__init__(cx=cx, cy=cy, r=r, **kwargs)
 
+    def local_bbox(self):
+        '''Return the bounding box of the circle, or None if its geometry is
+        not numeric.'''
+
+        try:
+            cx, cy, r = float(self.cx), float(self.cy), float(self.r)
+        except (AttributeError, ValueError):
+            return None
+
+        return (cx - r, cy - r, cx + r, cy + r)
+
+    def bake(self, matrix, attributes):
+        '''Bake a transformation into the center and radius of the circle.
+        Only similarity transformations can be baked, since anything else
+        would turn the circle into an ellipse.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this circle'''
+
+        scale = affine.similarity_scale(matrix)
+        if scale is None:
+            return False
+
+        try:
+            cx, cy, r = float(self.cx), float(self.cy), float(self.r)
+        except (AttributeError, ValueError):
+            return False
+
+        if not self._bake_stroke(attributes, scale):
+            return False
+
+        attributes['cx'], attributes['cy'] = affine.apply(matrix, cx, cy)
+        attributes['r'] = r * scale
+        return True
@@ -0,0 +1,179 @@
+'''Deduplication of repeated groups into <defs> and <use> elements.
+
+Before a dedupe render, every group in the document is given a structural
+key, built bottom-up from the rendered output of its leaves and the keys of
+its child groups, so that groups with identical contents share a key
+whatever their own attributes and transformation. Groups whose contents
+occur more than once are written once inside a <defs> block at the top of
+the document, and each copy is replaced by a <use> element carrying the
+copy's own attributes and transformation, which SVG applies exactly as it
+would to the group itself.'''
+
+import copy
+
+from values import escape_text
+
+# the namespace of the href attribute of <use> elements
+XLINK = 'http://www.w3.org/1999/xlink'
+
+class Symbols(object):
+    '''The repeated groups found in a document, and how to refer to them.'''
+
+    __slots__ = ('root', 'ids', 'defs', 'use_options')
+
+    # the prefix of the ids given to the groups written to <defs>
+    PREFIX = '_s'
+
+    def __init__(self, root, options):
+        '''Find the repeated groups below an element.
+
+        @param root: SVGBase
+            the element the render starts from
+        @param options: RenderOptions
+            the settings of the render'''
+
+        self.root = root
+
+        # uses are given their group's full transformation, since what it
+        # would bake into its children is written once in <defs>
+        if options.transforms == 'bake':
+            self.use_options = copy.copy(options)
+            self.use_options.transforms = 'collapse'
+        else:
+            self.use_options = options
+
+        plain = copy.copy(options)
+        plain.pretty = False
+        plain.cull = None
+        plain.instrument = None
+
+        bodies = {}
+        counts = {}
+        self._key(root, plain, {}, bodies, counts)
+
+        # find the copies from the top down, leaving the insides of repeated
+        # groups to their definition. The counts include copies inside other
+        # repeated groups, so a group can turn out to be used only once, in
+        # which case it is written in place and its insides are looked at
+        # in turn
+        uses = {}
+        order = []
+
+        stack = list(reversed(root._children or ()))
+        while stack:
+            while stack:
+                node = stack.pop()
+
+                body = bodies.get(id(node))
+                if body is not None and counts[body] > 1:
+                    if body not in uses:
+                        uses[body] = []
+                        order.append(body)
+                    uses[body].append(node)
+                elif node.TAG != 'defs':
+                    stack.extend(reversed(node._children or ()))
+
+            for body, nodes in uses.items():
+                if len(nodes) == 1:
+                    del uses[body]
+                    counts[body] = 1
+                    stack.extend(reversed(nodes[0]._children))
+
+        # name the definitions in the order they were first found
+        self.ids = {}
+        self.defs = []
+        for body in order:
+            nodes = uses.get(body)
+            if nodes is None:
+                continue
+
+            name = '{}{}'.format(self.PREFIX, len(self.defs))
+            self.defs.append((name, nodes[0]))
+            for node in nodes:
+                self.ids[id(node)] = name
+
+    def _key(self, node, options, table, bodies, counts):
+        '''Return the structural key of an element, recording the key of the
+        contents of every group below it, and how often each occurs.
+
+        @param node: SVGBase
+            the element
+        @param options: RenderOptions
+            the settings to render leaves with
+        @param table: dict
+            the small integer standing for each key seen so far
+        @param bodies: dict
+            the key of the contents of each group, by id
+        @param counts: dict
+            the number of groups with each key of contents'''
+
+        children = node._children
+        if not children or node.TAG == 'defs':
+            text = ''.join(node._iter(options, 0, None, None))
+            return table.setdefault(text, len(table))
+
+        body = (node.content, tuple(self._key(child, options, table, bodies, counts)
+                                    for child in children))
+        body = table.setdefault(body, len(table))
+
+        if node.TAG == 'g' and node is not self.root:
+            bodies[id(node)] = body
+            counts[body] = counts.get(body, 0) + 1
+
+        head = (node.TAG, node.render_attributes(options), body)
+        return table.setdefault(head, len(table))
+
+    def render_use(self, node, level, inherited):
+        '''Return the <use> element standing for a repeated group.
+
+        @param node: SVGBase
+            the group
+        @param level: int
+            the level of nesting the group is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None'''
+
+        options = self.use_options
+        padding = '' if not options.pretty else ' ' * (2 * level)
+
+        attributes = node.render_attributes(options, inherited)
+        if attributes:
+            attributes = ' ' + attributes
+
+        return '{}<use{} xlink:href="#{}" />'.format(
+            padding, attributes, self.ids[id(node)])
+
+    def iter_defs(self, options, level):
+        '''Yield the chunks of the <defs> block holding every repeated group.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting the block is at'''
+
+        # the contents are shared by every copy, so they cannot be culled
+        if options.cull is not None:
+            options = copy.copy(options)
+            options.cull = None
+
+        pretty = options.pretty
+        padding = '' if not pretty else ' ' * (2 * level)
+        inner = '' if not pretty else ' ' * (2 * level + 2)
+
+        yield '{}<defs>\n\n'.format(padding)
+
+        for i, (name, node) in enumerate(self.defs):
+            if i:
+                yield '\n'
+            yield '{}<g id="{}">\n{}\n'.format(inner, name,
+                                                escape_text(node._text(options.values)))
+
+            for j, child in enumerate(node._children):
+                if j:
+                    yield '\n'
+                for chunk in child._iter(options, level + 2, None, None):
+                    yield chunk
+
+            yield '\n{}</g>'.format(inner)
+
+        yield '\n{}</defs>'.format(padding)
@@ -0,0 +1,18 @@
+from base import SVGBase
+
+class Defs(SVGBase):
+    '''An SVG defs element, holding elements that are only drawn where they
+    are used.'''
+
+    __slots__ = ()
+
+    TAG = 'defs'
+
+    def __init__(self, **kwargs):
+        '''Create the defs element.
+
+        @param kwargs: keyword parameters
+            additional metadata'''
+
+        kwargs['load_defaults'] = False
+        super(Defs, self).__init__(**kwargs)
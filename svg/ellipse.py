@@ -1,10 +1,19 @@
+import affine
+from attrs import Attribute
 from base import SVGBase
 
 class Ellipse(SVGBase):
     '''An SVG ellipse.'''
 
+    __slots__ = ()
+
     TAG = 'ellipse'
 
+    cx = Attribute('cx')
+    cy = Attribute('cy')
+    rx = Attribute('rx')
+    ry = Attribute('ry')
+
     def __init__(self, cx, cy, rx, ry, **kwargs):
         '''Create the ellipse object, with additional metadata.
 
@@ -21,3 +30,42 @@ class Ellipse(SVGBase):
 
         super(Ellipse, self).__init__(cx=cx, cy=cy, rx=rx, ry=ry, **kwargs)
 
+    def local_bbox(self):
+        '''Return the bounding box of the ellipse, or None if its geometry is
+        not numeric.'''
+
+        try:
+            cx, cy = float(self.cx), float(self.cy)
+            rx, ry = float(self.rx), float(self.ry)
+        except (AttributeError, ValueError):
+            return None
+
+        return (cx - rx, cy - ry, cx + rx, cy + ry)
+
+    def bake(self, matrix, attributes):
+        '''Bake a transformation into the center and radii of the ellipse.
+        Only similarity transformations that keep the axes aligned can be
+        baked.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this ellipse'''
+
+        scale = affine.similarity_scale(matrix)
+        if scale is None or not affine.is_axis_aligned(matrix):
+            return False
+
+        try:
+            cx, cy = float(self.cx), float(self.cy)
+            rx, ry = float(self.rx), float(self.ry)
+        except (AttributeError, ValueError):
+            return False
+
+        if not self._bake_stroke(attributes, scale):
+            return False
+
+        attributes['cx'], attributes['cy'] = affine.apply(matrix, cx, cy)
+        attributes['rx'] = rx * scale
+        attributes['ry'] = ry * scale
+        return True
@@ -0,0 +1,229 @@
+import cPickle as pickle
+
+from attrs import Attrs
+from base import SVGBase
+from options import RenderOptions
+
+class _FrozenAttrs(Attrs):
+    '''An empty attributes mapping that refuses to be changed, for the
+    attributes and meta of a fragment.'''
+
+    __slots__ = ()
+
+    def _refuse(self, *args, **kwargs):
+        '''Refuse to change the mapping.'''
+
+        raise TypeError('frozen fragments cannot be changed')
+
+    __setitem__ = __delitem__ = __setattr__ = _refuse
+    clear = pop = popitem = setdefault = update = _refuse
+
+# the attributes and meta of every fragment
+_FROZEN = _FrozenAttrs()
+
+class Fragment(SVGBase):
+    '''An immutable snapshot of a group, made by Group.freeze, for content
+    that is the same in many documents, such as axes, legends and logos.
+
+    A fragment holds the compact XML of the group, its bounding box and its
+    pickled form. It can be added to any number of canvases and groups at
+    once: adding it costs a reference, and its output is reused by every
+    render with the same settings, so it is only rendered again for a new
+    level of pretty printing or transformation settings. Pickling a
+    fragment ships its pickled form as it is, without walking the group.
+
+    Since it is shared, a fragment has no single parent, and cannot be
+    changed - thaw() returns a copy of the group to edit instead. Stylesheet
+    renders do not look inside fragments when choosing the classes, though
+    the classes found elsewhere are applied to them.'''
+
+    __slots__ = ('pickled', 'box', 'xml', '_renders', '_group')
+
+    TAG = 'g'
+
+    # the most renders kept for settings other than the default ones
+    MAX_RENDERS = 32
+
+    def __init__(self, group):
+        '''Freeze a group.
+
+        @param group: Group
+            the group, which is left as it is and can go on changing without
+            affecting the fragment'''
+
+        super(Fragment, self).__init__(load_defaults=False)
+        _freeze(self)
+
+        options = RenderOptions()
+        xml = ''.join(group._iter(options, 0, None, None))
+
+        object.__setattr__(self, 'pickled',
+                           pickle.dumps(group, pickle.HIGHEST_PROTOCOL))
+        object.__setattr__(self, 'box', group.bbox())
+        object.__setattr__(self, 'xml', xml)
+        object.__setattr__(self, '_renders',
+                           {(options.key, 0, None, None): xml})
+        object.__setattr__(self, '_group', None)
+
+    def __reduce__(self):
+        '''Pickle the fragment by its pickled form, box and XML.'''
+
+        return _restore, (self.pickled, self.box, self.xml)
+
+    # a fragment is shared by every tree it is added to
+    def _get_parent(self):
+        return None
+
+    def _set_parent(self, parent):
+        pass
+
+    _parent = property(_get_parent, _set_parent)
+
+    def __setattr__(self, name, value):
+        '''Refuse to change the fragment.'''
+
+        raise TypeError('frozen fragments cannot be changed')
+
+    def __setitem__(self, name, value):
+        '''Refuse to change the fragment.'''
+
+        raise TypeError('frozen fragments cannot be changed')
+
+    @property
+    def transform(self):
+        '''An empty tuple - transform a group holding the fragment
+        instead.'''
+
+        return ()
+
+    def _add_transform(self, text, matrix):
+        '''Refuse to transform the fragment - transform a group holding it
+        instead.'''
+
+        raise TypeError('frozen fragments cannot be transformed')
+
+    def add_child(self, child):
+        '''Refuse to add a child to the fragment.'''
+
+        raise TypeError('frozen fragments cannot be changed')
+
+    @property
+    def children(self):
+        '''An empty tuple - the contents of a fragment are only rendered.'''
+
+        return ()
+
+    def clone(self):
+        '''Return the fragment itself, which is never changed, and so can be
+        shared by clones as it is.'''
+
+        return self
+
+    def _clone(self, parent):
+        '''Return the fragment itself, for clones of trees holding it.
+
+        @param parent: SVGBase
+            unused, fragments have no parent'''
+
+        return self
+
+    def thaw(self):
+        '''Return a new copy of the frozen group, which can be changed.'''
+
+        return pickle.loads(self.pickled)
+
+    def local_bbox(self):
+        '''Return the bounding box of the group, as it was frozen, in the
+        coordinate system of the fragment's parent.'''
+
+        return self.box
+
+    def _iter(self, options, level, inherited, ctm):
+        '''Return an iterator over the rendered XML of the group.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        if options.instrument is not None:
+            return options.instrument.iter(self, options, level, inherited, ctm)
+
+        return self._iter_chunks(options, level, inherited, ctm)
+
+    def _iter_chunks(self, options, level, inherited, ctm):
+        '''Return an iterator over the rendered XML of the group, reusing the
+        output of earlier renders with the same settings.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        # stylesheets and dedupe renders depend on the whole document
+        if options.styles is not None or options.symbols is not None:
+            return self._tree()._iter(options, level, inherited, ctm)
+
+        # compact output is the same at every level
+        key = (options.key, level if options.pretty else 0, inherited, ctm)
+
+        renders = self._renders
+        xml = renders.get(key)
+        if xml is None:
+            xml = ''.join(self._tree()._iter(options, level, inherited, ctm))
+            if len(renders) < self.MAX_RENDERS:
+                renders[key] = xml
+
+        return iter((xml,))
+
+    def _tree(self):
+        '''Return the private copy of the group that renders are made from,
+        unpickling it on first use.'''
+
+        group = self._group
+        if group is None:
+            group = self.thaw()
+            object.__setattr__(self, '_group', group)
+        return group
+
+def _restore(pickled, box, xml):
+    '''Rebuild an unpickled fragment, without unpickling the group.
+
+    @param pickled: str
+        the pickled form of the group
+    @param box: tuple
+        the bounding box of the group
+    @param xml: str
+        the compact XML of the group'''
+
+    fragment = Fragment.__new__(Fragment)
+    SVGBase.__init__(fragment, load_defaults=False)
+    _freeze(fragment)
+
+    object.__setattr__(fragment, 'pickled', pickled)
+    object.__setattr__(fragment, 'box', box)
+    object.__setattr__(fragment, 'xml', xml)
+    object.__setattr__(fragment, '_renders',
+                       {(RenderOptions().key, 0, None, None): xml})
+    object.__setattr__(fragment, '_group', None)
+
+    return fragment
+
+def _freeze(fragment):
+    '''Give a fragment attributes and meta that cannot be changed.
+
+    @param fragment: Fragment
+        the fragment'''
+
+    object.__setattr__(fragment, 'attributes', _FROZEN)
+    object.__setattr__(fragment, '_meta', _FROZEN)
@@ -1,18 +1,25 @@
 import collections
 
+import bounds
 from base import SVGBase
+from batch import Circles, Rects
 from circle import Circle
 from ellipse import Ellipse
+from fragment import Fragment
 from line import Line
 from path import Path
 from polygon import Polygon
 from polyline import Polyline
 from rect import Rect
+from spatial import GridIndex
 from text import Text
+from use import Use
 
 class Group(SVGBase):
     '''A group of SVG elements.'''
 
+    __slots__ = ('_index',)
+
     TAG = 'g'
 
     def __init__(self, **kwargs):
@@ -24,6 +31,82 @@ class Group(SVGBase):
         kwargs['load_defaults'] = False
         super(Group, self).__init__(**kwargs)
 
+        object.__setattr__(self, '_index', None)
+
+    def bake(self, matrix, attributes):
+        '''Groups bake their transformation by pushing it down onto their
+        children, so they never write one out themselves.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this group'''
+
+        return True
+
+    def local_bbox(self):
+        '''Return the union of the bounding boxes of the children, or None if
+        the group is empty or the box of any child is not known.'''
+
+        boxes = [child.bbox() for child in self.children]
+        if not boxes or None in boxes:
+            return None
+
+        return bounds.union(boxes)
+
+    def freeze(self):
+        '''Return an immutable fragment holding this group as it is now, to be
+        added to any number of canvases without rendering it again - see
+        Fragment.'''
+
+        return Fragment(self)
+
+    def spatial_index(self):
+        '''Return the spatial index over the elements below this group,
+        building it on first use. Once built, it is kept up to date with
+        elements added by add_child and changes tracked by invalidate().'''
+
+        index = self._index
+        if index is None:
+            index = GridIndex(self)
+            object.__setattr__(self, '_index', index)
+            SVGBase._indexed = True
+
+        return index
+
+    def drop_index(self):
+        '''Discard the spatial index over the elements below this group, if
+        it has one.'''
+
+        object.__setattr__(self, '_index', None)
+
+    def elements_at(self, x, y):
+        '''Return the elements below this group that lie under a point, in
+        the order they were indexed - drawing order, with the topmost last,
+        unless elements were later added to a group drawn before others.
+        Only leaf elements, those without children, are returned, and the
+        point is in the coordinate system of this group's children. Elements
+        are tested against their bounding box, in their own coordinate
+        system.
+
+        @param x: float
+            the x-coordinate of the point
+        @param y: float
+            the y-coordinate of the point'''
+
+        return self.spatial_index().elements_at(x, y)
+
+    def elements_in(self, rect):
+        '''Return the elements below this group whose bounding box overlaps a
+        rectangle, in the order they were indexed. Only leaf elements, those
+        without children, are returned, and the rectangle is in the
+        coordinate system of this group's children.
+
+        @param rect: tuple
+            the rectangle, as an (x, y, width, height) tuple'''
+
+        return self.spatial_index().elements_in(rect)
+
     def group(self, *args, **kwargs):
         '''Create a subgroup, add it to this group and return a reference to
         it. All arguments are passed to the group's constructor.
@@ -76,6 +159,46 @@ class Group(SVGBase):
         self.add_child(circle)
         return circle
 
+    def circles(self, cx, cy, r, **kwargs):
+        '''Create a batch of circles from columns of coordinates, add it to
+        this group and return a reference to it. This holds any number of
+        circles in a single node, which is far cheaper than calling circle()
+        once per point.
+
+        @param cx: sequence or float
+            the x coordinates of the centers of the circles
+        @param cy: sequence or float
+            the y coordinates of the centers of the circles
+        @param r: sequence or float
+            the radii of the circles, or a single radius for all of them
+        @param kwargs: keyword arguments
+            the attributes shared by all of the circles'''
+
+        circles = Circles(cx, cy, r, **kwargs)
+        self.add_child(circles)
+        return circles
+
+    def rects(self, x, y, width, height, **kwargs):
+        '''Create a batch of rects from columns of coordinates, add it to this
+        group and return a reference to it. This holds any number of rects in
+        a single node, which is far cheaper than calling rect() once per
+        rectangle.
+
+        @param x: sequence or float
+            the x coordinates of the corners closest to the origin
+        @param y: sequence or float
+            the y coordinates of the corners closest to the origin
+        @param width: sequence or float
+            the widths of the rectangles, or a single width for all of them
+        @param height: sequence or float
+            the heights of the rectangles, or a single height for all of them
+        @param kwargs: keyword arguments
+            the attributes shared by all of the rects'''
+
+        rects = Rects(x, y, width, height, **kwargs)
+        self.add_child(rects)
+        return rects
+
     def ellipse(self, *args, **kwargs):
         '''Create a ellipse, add it to this group and return a reference to it. 
         All arguments are passed to the circle's constructor.
@@ -141,3 +264,20 @@ class Group(SVGBase):
         self.add_child(text)
         return text
 
+    def use(self, symbol, x=0, y=0, **kwargs):
+        '''Draw a copy of a symbol defined on the canvas, offset by (x,y), add
+        it to this group and return a reference to it. Transformations and
+        presentation attributes given to the copy apply to it alone.
+
+        @param symbol: SVGBase
+            the symbol to draw, as returned by Canvas.define
+        @param x: optional, float
+            the x offset of the copy
+        @param y: optional, float
+            the y offset of the copy
+        @param kwargs: keyword arguments
+            the keyword arguments to pass to the use element's constructor'''
+
+        use = Use(symbol, x, y, **kwargs)
+        self.add_child(use)
+        return use
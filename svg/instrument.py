@@ -0,0 +1,174 @@
+'''Instrumentation of renders, to find out where the time and bytes of a
+document go.
+
+An Instrument is passed to a render as the instrument setting, and counts
+what the render does while it runs:
+
+    instrument = Instrument()
+    canvas.save('chart.svg', instrument=instrument)
+    print(instrument.report())
+
+Renders without an instrument only pay for checking that there is none.'''
+
+import collections
+import timeit
+
+class Instrument(object):
+    '''The counts, byte totals and timings gathered over one or more renders,
+    and the hooks called as each element is rendered.
+
+    Timings are split between assembling the attributes of elements, the
+    RENDERERS callbacks formatting their values, and joining the attributes
+    into strings, with the rest of the time - writing tags, walking the tree
+    and culling - given as 'other'. With caching on, subtrees taken from the
+    cache are counted as a single element.'''
+
+    __slots__ = ('on_enter', 'on_exit', 'depth', 'counts', 'attribute_bytes',
+                 'subtree_bytes', 'timings', 'bytes', '_stack')
+
+    # the parts of a render that are timed separately
+    PHASES = ('attributes', 'renderers', 'joining')
+
+    def __init__(self, on_enter=None, on_exit=None, depth=1):
+        '''Create the instrument.
+
+        @param on_enter: optional, callable
+            called with an element and its level of nesting as it starts
+            being rendered
+        @param on_exit: optional, callable
+            called with an element, its level of nesting, the number of bytes
+            written for its subtree and the seconds it took, once it has been
+            rendered
+        @param depth: optional, int
+            the deepest level below the element a render starts from at which
+            subtree byte totals are kept'''
+
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.depth = depth
+        self.reset()
+
+    def reset(self):
+        '''Clear everything gathered so far.'''
+
+        self.counts = collections.defaultdict(int)
+        self.attribute_bytes = collections.defaultdict(int)
+        self.subtree_bytes = []
+        self.timings = dict.fromkeys(self.PHASES + ('total',), 0.0)
+        self.bytes = 0
+        self._stack = []
+
+    def report(self):
+        '''Return everything gathered so far, as a dict of plain values that
+        can be written out as JSON. Subtrees are named by their path from the
+        element the render started from, using ids where elements have one
+        and positions among their siblings otherwise.'''
+
+        timings = dict(self.timings)
+        timings['other'] = max(0.0, timings['total'] - sum(
+            timings[phase] for phase in self.PHASES))
+
+        return {
+            'bytes': self.bytes,
+            'counts': dict(self.counts),
+            'attribute_bytes': dict(self.attribute_bytes),
+            'subtree_bytes': list(self.subtree_bytes),
+            'timings': timings,
+        }
+
+    def iter(self, element, options, level, inherited, ctm):
+        '''Yield the chunks of the rendered XML for an element, counting them
+        and calling the hooks around them.
+
+        @param element: SVGBase
+            the element
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting the element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from, tracked when culling'''
+
+        tag = element.TAG or 'raw'
+        self.counts[tag] += 1
+
+        # name the subtree by its path, counting the children of each level
+        stack = self._stack
+        name = element.attributes.get('id')
+        if stack:
+            parent = stack[-1]
+            if name is None:
+                name = '{}[{}]'.format(tag, parent[1])
+            else:
+                name = '{}#{}'.format(tag, name)
+            parent[1] += 1
+            path = '{}/{}'.format(parent[0], name)
+        else:
+            path = '/' + tag if name is None else '/{}#{}'.format(tag, name)
+        stack.append([path, 0])
+
+        if self.on_enter is not None:
+            self.on_enter(element, level)
+
+        start = timeit.default_timer()
+
+        size = 0
+        try:
+            for chunk in element._iter_chunks(options, level, inherited, ctm):
+                size += len(chunk)
+                yield chunk
+        finally:
+            stack.pop()
+
+        elapsed = timeit.default_timer() - start
+
+        if len(stack) <= self.depth:
+            self.subtree_bytes.append((path, size))
+        if not stack:
+            self.bytes += size
+            self.timings['total'] += elapsed
+
+        if self.on_exit is not None:
+            self.on_exit(element, level, size, elapsed)
+
+    def render_attributes(self, element, options, inherited):
+        '''Return the rendered attributes of an element, timing each part of
+        the work and counting the bytes written for each attribute.
+
+        @param element: SVGBase
+            the element
+        @param options: RenderOptions
+            the settings of the render
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None'''
+
+        timer = timeit.default_timer
+        timings = self.timings
+
+        start = timer()
+        attributes = element._assemble_attributes(options, inherited)
+        assembled = timer()
+        element._run_renderers(attributes, options)
+        rendered = timer()
+        if options.styles is not None:
+            options.styles.apply(attributes)
+        styled = timer()
+
+        values = options.values
+        counts = self.attribute_bytes
+        parts = []
+        for name, value in attributes.iteritems():
+            part = '%s="%s"' % (name, values(value))
+            counts[name] += len(part)
+            parts.append(part)
+        text = ' '.join(parts)
+        joined = timer()
+
+        timings['attributes'] += (assembled - start) + (styled - rendered)
+        timings['renderers'] += rendered - assembled
+        timings['joining'] += joined - styled
+
+        return text
@@ -0,0 +1,56 @@
+class LazyChildren(list):
+    '''The children of a loaded element that have not been parsed yet, kept as
+    the raw bytes between the element's opening and closing tags. It stands
+    in for an empty list until the children are asked for, at which point
+    the builder replaces it with the parsed children. Until then the bytes
+    are written out verbatim.'''
+
+    __slots__ = ('raw', 'builder')
+
+    def __init__(self, raw, builder):
+        '''Create the placeholder.
+
+        @param raw: str
+            the contents of the element, as they appear in the document
+        @param builder: callable
+            a module level function taking the element and the raw contents,
+            which parses the contents and returns the list of children'''
+
+        list.__init__(self)
+        self.raw = raw
+        self.builder = builder
+
+    def __reduce__(self):
+        '''Pickle the placeholder by its raw contents.'''
+
+        return LazyChildren, (self.raw, self.builder)
+
+class SharedChildren(list):
+    '''The children of a clone that have not been cloned themselves yet. It
+    holds the very elements that are the children of the element the clone
+    was made from, its owner, so that renders of the clone and walks over
+    its tree see them as they are. The holder replaces it with clones of them
+    when its children are asked for, or when the owner is about to change
+    anything below it.'''
+
+    __slots__ = ('owner', 'holder', '__weakref__')
+
+    def __init__(self, children, owner, holder):
+        '''Create the shared children.
+
+        @param children: list
+            the children of the owner
+        @param owner: SVGBase
+            the element the children belong to
+        @param holder: SVGBase
+            the clone sharing them'''
+
+        list.__init__(self, children)
+        self.owner = owner
+        self.holder = holder
+
+    def __reduce__(self):
+        '''Pickle the shared children as a plain list, owned by the unpickled
+        holder.'''
+
+        return list, (list(self),)
@@ -1,10 +1,19 @@
+import affine
+from attrs import Attribute
 from base import SVGBase
 
 class Line(SVGBase):
     '''An SVG line.'''
 
+    __slots__ = ()
+
     TAG = 'line'
 
+    x1 = Attribute('x1')
+    y1 = Attribute('y1')
+    x2 = Attribute('x2')
+    y2 = Attribute('y2')
+
     def __init__(self, x1, y1, x2, y2, **kwargs):
         '''Create the line object, with additional metadata.
 
@@ -21,3 +30,39 @@ class Line(SVGBase):
 
         super(Line, self).__init__(x1=x1, y1=y1, x2=x2, y2=y2, **kwargs)
 
+    def local_bbox(self):
+        '''Return the bounding box of the line, or None if its geometry is not
+        numeric.'''
+
+        try:
+            x1, y1 = float(self.x1), float(self.y1)
+            x2, y2 = float(self.x2), float(self.y2)
+        except (AttributeError, ValueError):
+            return None
+
+        return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+    def bake(self, matrix, attributes):
+        '''Bake a similarity transformation into the endpoints of the line.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this line'''
+
+        scale = affine.similarity_scale(matrix)
+        if scale is None:
+            return False
+
+        try:
+            x1, y1 = float(self.x1), float(self.y1)
+            x2, y2 = float(self.x2), float(self.y2)
+        except (AttributeError, ValueError):
+            return False
+
+        if not self._bake_stroke(attributes, scale):
+            return False
+
+        attributes['x1'], attributes['y1'] = affine.apply(matrix, x1, y1)
+        attributes['x2'], attributes['y2'] = affine.apply(matrix, x2, y2)
+        return True
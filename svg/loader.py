@@ -0,0 +1,372 @@
+'''Loading of SVG documents back into the element tree.
+
+Documents are read with expat, but only as deeply as they are used. Loading
+reads just the start tag of the root, and keeps everything between its
+opening and closing tags as the raw bytes of the document. The contents of
+an element are only parsed when its children are first asked for, one level
+at a time, and until then they are written out exactly as they were read.
+Loading and saving a large template therefore costs about as much as copying
+it, however many elements it holds, and only the parts of the tree that are
+touched pay for parsing.
+
+Elements are built as their usual classes, with path data and points parsed
+into their numeric buffers and transform attributes into transformations.
+Elements of other kinds, and text mixed with elements, are kept as Raw
+pieces and written out unchanged. Comments and processing instructions
+between elements are dropped when the contents around them are parsed.
+
+The prolog of the document, with its DOCTYPE, is not kept. General entities
+declared in its internal subset are expanded when the document is loaded,
+so that the contents parse, and write out, on their own.
+
+Since the document is only read as far as it is used, errors in parts that
+are never touched are not reported.'''
+
+import re
+import xml.parsers.expat
+
+import affine
+from base import SVGBase
+from canvas import Canvas
+from circle import Circle
+from defs import Defs
+from ellipse import Ellipse
+from group import Group
+from lazy import LazyChildren
+from line import Line
+from path import Path
+from pathdata import PathData
+from points import PointBuffer
+from polygon import Polygon
+from polyline import Polyline
+from raw import Raw
+from rect import Rect
+from text import Text
+from use import Use
+
+# the class each tag is loaded as
+CLASSES = {
+    'svg': Canvas,
+    'g': Group,
+    'defs': Defs,
+    'path': Path,
+    'rect': Rect,
+    'circle': Circle,
+    'ellipse': Ellipse,
+    'line': Line,
+    'polyline': Polyline,
+    'polygon': Polygon,
+    'text': Text,
+    'use': Use,
+}
+
+# the wrapper the contents of an element are parsed inside
+_OPEN = '<_>'
+_CLOSE = '</_>'
+
+# the slots each class adds to SVGBase, set to None on loaded elements
+_SLOTS = {}
+
+# the encoding declared by a document
+_ENCODING = re.compile(r'\s*<\?xml[^>]*encoding\s*=\s*["\']([A-Za-z0-9._-]+)')
+
+# a reference to a general entity
+_REFERENCE = re.compile(r'&([A-Za-z_:][\w.:-]*);')
+
+# the deepest nesting of entities in the values of other entities expanded
+_ENTITY_DEPTH = 8
+
+class _Stop(Exception):
+    '''Raised to stop the parser once the start tag of the root is read.'''
+
+def load(source):
+    '''Load an SVG document, and return its root element, usually a Canvas.
+
+    @param source: str or file
+        the path of the document, or a file-like object open for reading in
+        binary mode'''
+
+    if isinstance(source, basestring):
+        with open(source, 'rb') as f:
+            data = f.read()
+    else:
+        data = source.read()
+
+    return loads(data)
+
+def loads(data):
+    '''Load an SVG document from a string, and return its root element.
+
+    @param data: str
+        the document'''
+
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    else:
+        match = _ENCODING.match(data)
+        if match is not None and match.group(1).lower() not in (
+                'utf-8', 'utf8', 'us-ascii', 'ascii'):
+            data = data.decode(match.group(1)).encode('utf-8')
+
+    found = []
+    entities = {}
+
+    parser = _parser()
+
+    def entity(name, parameter, value, *args):
+        if value is not None and not parameter:
+            entities[name] = value
+
+    def start(name, attributes):
+        if found:
+            mark()
+        found.extend((name, attributes, parser.CurrentByteIndex))
+
+    def mark(*args):
+        if found:
+            found.append(parser.CurrentByteIndex)
+            raise _Stop()
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = mark
+    parser.CharacterDataHandler = mark
+    parser.CommentHandler = mark
+    parser.ProcessingInstructionHandler = mark
+    parser.EntityDeclHandler = entity
+
+    try:
+        parser.Parse(data, True)
+    except _Stop:
+        pass
+
+    if len(found) != 4:
+        raise ValueError('no root element found')
+
+    tag, attributes, start, inner = found
+
+    # the DTD is dropped, so the entities it declares are expanded in place
+    if entities:
+        return loads(_expand(data[start:], entities))
+
+    if data[inner-2:inner] == '/>':
+        item = (tag, attributes, start, None, None, inner)
+    else:
+        closing = data.rfind('</' + tag, inner)
+        if closing < 0:
+            raise ValueError('the root element is not closed')
+        item = (tag, attributes, start, inner, closing,
+                data.index('>', closing) + 1)
+
+    return _element(item, data)
+
+def _expand(data, entities):
+    '''Return part of a document with the references to general entities
+    replaced by their values.
+
+    @param data: str
+        the part of the document
+    @param entities: dict
+        the value of each entity, by name'''
+
+    def replace(match):
+        return entities.get(match.group(1), match.group(0))
+
+    for _ in xrange(_ENTITY_DEPTH):
+        expanded = _REFERENCE.sub(replace, data)
+        if expanded == data:
+            break
+        data = expanded
+
+    return data
+
+def _parser():
+    '''Return a new expat parser, reporting strings as UTF-8 bytes.'''
+
+    parser = xml.parsers.expat.ParserCreate('utf-8')
+    if hasattr(parser, 'returns_unicode'):
+        parser.returns_unicode = False
+    return parser
+
+def _element(item, data):
+    '''Build the element for a tag found in a document, leaving its contents
+    to be parsed when they are first asked for.
+
+    @param item: tuple
+        the tag, its attributes, and the offsets of its start, the start and
+        end of its contents, or None if it has none, and its end
+    @param data: str
+        the document, or the contents the tag was found in'''
+
+    tag, attributes, start, inner, closing, end = item
+
+    cls = CLASSES.get(tag)
+    if cls is None:
+        return Raw(data[start:end])
+
+    element = cls.__new__(cls)
+    SVGBase.__init__(element, load_defaults=False)
+    for name in _slots(cls):
+        object.__setattr__(element, name, None)
+    if cls is Path:
+        object.__setattr__(element, 'closed', False)
+
+    values = element.attributes
+    values.update(attributes)
+
+    transform = attributes.get('transform')
+    if transform is not None:
+        try:
+            matrix = affine.parse(transform)
+        except ValueError:
+            pass
+        else:
+            text = values.pop('transform')
+            if matrix is not None:
+                object.__setattr__(element, '_transform', [text])
+                object.__setattr__(element, '_matrix', matrix)
+
+    if cls is Path and 'd' in attributes:
+        try:
+            values['d'] = PathData.parse(attributes['d'])
+        except ValueError:
+            pass
+    elif issubclass(cls, Polyline) and 'points' in attributes:
+        try:
+            points = PointBuffer.parse(attributes['points'])
+        except ValueError:
+            pass
+        else:
+            if not len(points.coords) % 2:
+                values['points'] = points
+
+    if inner is not None and inner < closing:
+        object.__setattr__(element, '_children',
+                           LazyChildren(data[inner:closing], expand))
+
+    return element
+
+def _slots(cls):
+    '''Return the names of the slots a class adds to SVGBase.
+
+    @param cls: type
+        a subclass of SVGBase'''
+
+    slots = _SLOTS.get(cls)
+    if slots is None:
+        slots = _SLOTS[cls] = []
+        for klass in cls.__mro__:
+            if klass is SVGBase:
+                break
+            slots.extend(klass.__dict__.get('__slots__', ()))
+    return slots
+
+def expand(element, contents):
+    '''Parse the contents of a loaded element, and return its children. The
+    contents of each child are left to be parsed in turn. Text alone becomes
+    the content of the element.
+
+    @param element: SVGBase
+        the element
+    @param contents: str
+        the raw contents of the element'''
+
+    items, text = _Splitter().split(contents)
+    text = text.strip()
+
+    if not items:
+        object.__setattr__(element, 'content', text)
+        children = []
+    elif text:
+        children = [Raw(contents)]
+    else:
+        children = [_element(item, contents) for item in items]
+
+    for child in children:
+        object.__setattr__(child, '_parent', element)
+
+    return children
+
+class _Splitter(object):
+    '''A pass of expat over the contents of an element, finding where each of
+    its children starts and ends, and the text between them.'''
+
+    __slots__ = ('parser', 'depth', 'items', 'text', 'opened', 'contents')
+
+    def split(self, contents):
+        '''Return the tags of the children found in some contents, as
+        described by _element, and the text between them.
+
+        @param contents: str
+            the raw contents of an element'''
+
+        self.depth = 0
+        self.items = []
+        self.text = []
+        self.opened = None
+        self.contents = contents
+
+        parser = self.parser = _parser()
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.characters
+        parser.CommentHandler = self.mark
+        parser.ProcessingInstructionHandler = self.mark
+
+        parser.Parse(_OPEN + contents + _CLOSE, True)
+
+        return [tuple(item) for item in self.items], ''.join(self.text)
+
+    def _offset(self):
+        '''Return the offset of the current event in the contents.'''
+
+        return self.parser.CurrentByteIndex - len(_OPEN)
+
+    def mark(self, *args):
+        '''Note the start of the contents of the child opened last, if this
+        is the first event since.'''
+
+        opened = self.opened
+        if opened is not None:
+            opened[3] = self._offset()
+            self.opened = None
+
+    def start(self, name, attributes):
+        '''Handle a start tag.'''
+
+        self.mark()
+        self.depth += 1
+        if self.depth == 2:
+            item = [name, attributes, self._offset(), None, None, None]
+            self.items.append(item)
+            self.opened = item
+
+    def end(self, name):
+        '''Handle an end tag, or the end of an empty element.'''
+
+        if self.depth == 2:
+            item = self.items[-1]
+            offset = self._offset()
+
+            if self.opened is item:
+                # nothing between the tags: the offset is just after the
+                # start tag, which is the whole element if it is empty
+                self.opened = None
+                if self.contents[offset-2:offset] == '/>':
+                    item[5] = offset
+                    self.depth -= 1
+                    return
+                item[3] = offset
+
+            item[4] = offset
+            item[5] = self.contents.index('>', offset) + 1
+        else:
+            self.mark()
+
+        self.depth -= 1
+
+    def characters(self, data):
+        '''Handle character data.'''
+
+        self.mark()
+        if self.depth == 1:
+            self.text.append(data)
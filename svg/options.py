@@ -0,0 +1,128 @@
+from values import serializer
+
+class RenderOptions(object):
+    '''The settings for a single render. One instance is created per call to
+    render, iter_render, write_to or save, and shared by every element
+    rendered.'''
+
+    __slots__ = ('pretty', 'cache', 'transforms', 'path_data', 'precision',
+                 'snap', 'cull', 'dedupe', 'stylesheet', 'instrument',
+                 'values', 'symbols', 'styles')
+
+    # the ways of writing out transformations
+    TRANSFORM_MODES = ('keep', 'collapse', 'bake')
+
+    # the ways of writing out path data
+    PATH_DATA_MODES = ('full', 'compact')
+
+    def __init__(self, pretty=False, cache=False, transforms='keep',
+                 path_data='full', precision=None, snap=None, cull=None,
+                 dedupe=False, stylesheet=False, instrument=None):
+        '''Create the render options.
+
+        @param pretty: optional, bool
+            a flag controlling pretty printing - pretty printing will perform
+            indentations based on nesting level
+        @param cache: optional, bool
+            a flag controlling output caching - when set, the output of every
+            subtree is kept, and reused for as long as the subtree is
+            unchanged
+        @param transforms: optional, str
+            how transformations are written out - 'keep' writes each element's
+            transformation list as it was built, 'collapse' writes a single
+            matrix(), and 'bake' applies the matrix to the element's
+            coordinates where that can be done exactly, pushing group
+            transformations down onto their children, and falls back to a
+            single matrix() elsewhere
+        @param path_data: optional, str
+            how path data is written out - 'full' writes every command with
+            absolute, six decimal coordinates, and 'compact' writes the
+            shortest equivalent it can find, with relative coordinates,
+            implicit commands, shorthands and trimmed numbers
+        @param precision: optional, int
+            the number of decimal places numbers are rounded to, in attribute
+            values and compact path data - if not given, attribute values keep
+            up to 12 significant digits, and compact path data 6 decimal
+            places
+        @param snap: optional, float
+            write numbers in attribute values that lie within this distance
+            of an integer as that integer
+        @param cull: optional, bool or tuple
+            leave out every subtree whose bounding box lies entirely outside
+            a rectangle - either True for the viewport of the canvas being
+            rendered, or an (x, y, width, height) tuple in the coordinate
+            system of the element the render starts from, with False or None
+            for no culling. Boxes are padded by half the stroke width in
+            effect on each child; strokes widened further below a child,
+            markers and long miter joins may still reach into the rectangle
+            from a subtree that is left out
+        @param dedupe: optional, bool
+            write every group whose contents are repeated elsewhere in the
+            document once, in a <defs> block, and refer to it with <use>
+            elements carrying each copy's own attributes and transformation.
+            Output caching is not used by these renders
+        @param stylesheet: optional, bool
+            give every combination of presentation attributes used by more
+            than one element a short class name, defined in a <style> block
+            at the top of the document, and write the class in place of the
+            attributes. Output caching is not used by these renders
+        @param instrument: optional, Instrument
+            an instrument counting the elements, bytes and time of the render,
+            and calling its hooks around each element - see the instrument
+            module'''
+
+        if transforms not in self.TRANSFORM_MODES:
+            raise ValueError('unknown transforms mode {!r}'.format(transforms))
+        if path_data not in self.PATH_DATA_MODES:
+            raise ValueError('unknown path_data mode {!r}'.format(path_data))
+
+        self.pretty = pretty
+        self.cache = cache and not (dedupe or stylesheet)
+        self.transforms = transforms
+        self.path_data = path_data
+        self.precision = precision
+        self.snap = snap
+
+        # culling rectangles are kept as bounding boxes, and False turns
+        # culling off as None does
+        if cull is False:
+            cull = None
+        elif cull is not None and cull is not True:
+            x, y, width, height = cull
+            cull = (x, y, x + width, y + height)
+        self.cull = cull
+
+        # the repeated groups found before a dedupe render, a Symbols object,
+        # and the classes named before a stylesheet render, a Stylesheet
+        self.dedupe = dedupe
+        self.stylesheet = stylesheet
+        self.instrument = instrument
+
+        # the formatting of attribute values, shared by renders with the same
+        # precision and snapping
+        self.values = serializer(precision, snap)
+
+        self.symbols = None
+        self.styles = None
+
+    def __getstate__(self):
+        '''Return the settings as a tuple, for pickling.'''
+
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        '''Restore the settings after unpickling.
+
+        @param state: tuple
+            the state returned by __getstate__'''
+
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @property
+    def key(self):
+        '''Everything that affects the output of an element, other than the
+        element itself and its position in the tree.'''
+
+        return (self.pretty, self.transforms, self.path_data, self.precision,
+                self.snap, self.cull, self.dedupe, self.stylesheet)
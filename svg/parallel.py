@@ -0,0 +1,160 @@
+'''Rendering across a pool of processes. Elements are shipped to the workers
+by pickling, so anything passed in, including factories, must be picklable:
+elements, module level functions and functools.partial objects all are.
+
+Output is exactly that of the serial render() in every case.'''
+
+import copy
+import multiprocessing
+
+from base import SVGBase
+
+def _build(scene):
+    '''Return the element a scene stands for, calling it if it is a factory.
+
+    @param scene: SVGBase or callable
+        the element, or a callable taking no arguments that returns one'''
+
+    if isinstance(scene, SVGBase):
+        return scene
+    return scene()
+
+def _render_job(job):
+    '''Render a scene in a worker.
+
+    @param job: tuple
+        the scene, pretty flag and render settings'''
+
+    scene, pretty, options = job
+    return _build(scene).render(pretty=pretty, **options)
+
+def _save_job(job):
+    '''Build a canvas and save it to a file in a worker, returning the path.
+
+    @param job: tuple
+        the path, scene, pretty flag and render settings'''
+
+    path, scene, pretty, options = job
+    _build(scene).save(path, pretty=pretty, **options)
+    return path
+
+def _render_child_job(job):
+    '''Render one child of an element rendered by render_parallel.
+
+    @param job: tuple
+        the child, render settings and the level, inherited transformation
+        and ctm to render it with'''
+
+    child, options, level, inherited, ctm = job
+    return ''.join(child._iter(options, level, inherited, ctm))
+
+def _map(function, jobs, workers, chunksize):
+    '''Apply a function to every job, in order, on a pool of processes, or
+    in this process if there is only one worker.
+
+    @param function: callable
+        the function, defined at module level so that it can be pickled
+    @param jobs: iterable
+        the arguments of each call
+    @param workers: int
+        the number of processes, or None for one per CPU
+    @param chunksize: int
+        the number of jobs sent to a worker at a time'''
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers == 1:
+        return [function(job) for job in jobs]
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = list(pool.imap(function, jobs, chunksize))
+    finally:
+        pool.close()
+        pool.join()
+
+    return results
+
+def render_many(scenes, workers=None, pretty=False, chunksize=16, **options):
+    '''Render many independent elements in parallel, and return their XML in
+    the same order.
+
+    @param scenes: iterable
+        the elements to render, or callables taking no arguments that build
+        them - factories save shipping whole scenes to the workers
+    @param workers: optional, int
+        the number of processes, one per CPU if not given
+    @param pretty: optional, bool
+        a flag controlling pretty printing
+    @param chunksize: optional, int
+        the number of scenes sent to a worker at a time
+    @param options: keyword parameters
+        additional render settings - see RenderOptions'''
+
+    jobs = ((scene, pretty, options) for scene in scenes)
+    return _map(_render_job, jobs, workers, chunksize)
+
+def save_many(jobs, workers=None, pretty=False, chunksize=16, **options):
+    '''Save many independent canvases in parallel, each worker writing the
+    files for the canvases it renders, and return the paths written.
+
+    @param jobs: iterable
+        (path, scene) pairs, where each scene is a canvas or a callable
+        taking no arguments that builds one
+    @param workers: optional, int
+        the number of processes, one per CPU if not given
+    @param pretty: optional, bool
+        a flag controlling pretty printing
+    @param chunksize: optional, int
+        the number of canvases sent to a worker at a time
+    @param options: keyword parameters
+        additional render settings - see RenderOptions'''
+
+    jobs = ((path, scene, pretty, options) for path, scene in jobs)
+    return _map(_save_job, jobs, workers, chunksize)
+
+def render_parallel(element, workers=None, pretty=False, chunksize=1, **options):
+    '''Render a single large element, such as a canvas, by rendering each of
+    its children in parallel and joining the results in order. This pays
+    off when the children are few and large, since each is pickled to be
+    sent to a worker. Dedupe renders are not supported.
+
+    @param element: SVGBase
+        the element to render
+    @param workers: optional, int
+        the number of processes, one per CPU if not given
+    @param pretty: optional, bool
+        a flag controlling pretty printing
+    @param chunksize: optional, int
+        the number of children sent to a worker at a time
+    @param options: keyword parameters
+        additional render settings - see RenderOptions'''
+
+    options = element.render_options(pretty, **options)
+    if options.dedupe:
+        raise ValueError('dedupe renders cannot be split across processes')
+
+    head, tail, children, inherited, ctm = element._render_parts(
+        options, 0, None, None)
+    if tail is None:
+        return head
+
+    # the stylesheet is written here, and the workers only need its classes
+    # rather than the whole tree it was collected from
+    styles = options.styles
+    block = ''
+    if styles is not None:
+        if styles.classes:
+            block = styles.render(options.pretty, 1)
+            if children:
+                block += '\n'
+        styles = copy.copy(styles)
+        styles.root = None
+        options = copy.copy(options)
+        options.styles = styles
+
+    jobs = [(child, options, 1, inherited, ctm) for child in children]
+    results = _map(_render_child_job, jobs, workers, chunksize)
+
+    return head + block + '\n'.join(results) + tail
@@ -0,0 +1,422 @@
+'''Differences between two element trees, as patches small enough to send
+to a browser on every update of a live document.
+
+A patch is a list of operations, plain dicts that can be written out as
+JSON, which turn the rendered old tree into the rendered new one when they
+are applied in order:
+
+    {"op": "remove", "target": key}
+    {"op": "insert", "parent": key, "index": n, "xml": "<circle ... />"}
+    {"op": "replace", "target": key, "xml": "<g>...</g>"}
+    {"op": "attributes", "target": key, "set": {name: value},
+     "remove": [name]}
+    {"op": "content", "target": key, "value": text}
+
+Elements are named by keys: '#' and the id of elements that have one, and
+otherwise the key of their parent, a slash and their position among its
+children, with '/' for the root - '#chart/2/0', say. Positions are those
+at the time the operation is applied. Attribute values and text are given
+as they are written out, but without XML escaping, and path data and
+points as their formatted values.
+
+Children are matched by identity first, then by id, and then in order among
+the children without an id, working in from both ends while they look the
+same, so a single child added or removed is found as such - elements that
+move should be given ids. Subtrees that are the same object in both trees,
+or that a clone still shares with its original, are skipped without being
+looked at, which makes diffing a clone taken before a set of changes
+against the changed tree cost about as much as the changed elements and
+their siblings.
+
+Elements writing their own output, such as marker batches, need not write
+one element each, so positions among their siblings are not those of the
+DOM. An element with such children is replaced as a whole when any of its
+children changes - keep batches in a group of their own:
+
+    before = canvas.clone()
+    ... change canvas ...
+    json.dumps(diff(before, canvas))'''
+
+import bisect
+from itertools import chain, izip
+
+from base import SVGBase
+from lazy import LazyChildren, SharedChildren
+from options import RenderOptions
+
+def diff(old, new, precision=None, snap=None, path_data='full'):
+    '''Return the patch turning the rendered old tree into the rendered new
+    one, as a list of operations.
+
+    @param old: SVGBase
+        the root of the old tree
+    @param new: SVGBase
+        the root of the new tree
+    @param precision: optional, int
+        the number of decimal places numbers are written with - see
+        RenderOptions
+    @param snap: optional, float
+        the distance from an integer within which numbers are written as
+        that integer - see RenderOptions
+    @param path_data: optional, str
+        how path data is written - see RenderOptions'''
+
+    options = RenderOptions(precision=precision, snap=snap,
+                            path_data=path_data)
+
+    patch = []
+    if _comparable(old, new):
+        _diff_element(old, new, '/', options, patch)
+    else:
+        patch.append({'op': 'replace', 'target': '/',
+                      'xml': _render(new, options)})
+    return patch
+
+def _diff_element(old, new, key, options, patch):
+    '''Add the operations turning one element into another to a patch.
+
+    @param old: SVGBase
+        the old element
+    @param new: SVGBase
+        the new element, of the same kind
+    @param key: str
+        the key of the element
+    @param options: RenderOptions
+        the settings values are formatted with
+    @param patch: list
+        the operations found so far'''
+
+    if _unchanged(old, new):
+        return
+
+    # elements with their own output are compared by it
+    if _opaque(new):
+        xml = _render(new, options)
+        if _render(old, options) != xml:
+            patch.append({'op': 'replace', 'target': key, 'xml': xml})
+        return
+
+    old_children = old._children
+    new_children = new._children
+
+    if old.content != new.content:
+        if old_children or new_children:
+            # setting the text would drop the children
+            patch.append({'op': 'replace', 'target': key,
+                          'xml': _render(new, options)})
+            return
+        patch.append({'op': 'content', 'target': key,
+                      'value': new._text(options.values)})
+
+    start = len(patch)
+    _diff_attributes(old, new, key, options, patch)
+
+    if type(old_children) is LazyChildren or type(new_children) is LazyChildren:
+        # unparsed contents are compared as they were read
+        if (type(old_children) is type(new_children) and
+                old_children.raw == new_children.raw):
+            return
+        old_children, new_children = old.children, new.children
+    elif old_children == new_children:
+        # the same elements, compared by identity
+        return
+
+    if any(_opaque(child) for child in chain(old_children or (),
+                                             new_children or ())):
+        # positions among the children are not those of the DOM
+        xml = _render(new, options)
+        if _render(old, options) != xml:
+            del patch[start:]
+            patch.append({'op': 'replace', 'target': key, 'xml': xml})
+        return
+
+    _diff_children(old_children or (), new_children or (), key, options,
+                   patch)
+
+def _diff_attributes(old, new, key, options, patch):
+    '''Add the changes to the attributes of an element to a patch.
+
+    @param old: SVGBase
+        the old element
+    @param new: SVGBase
+        the new element
+    @param key: str
+        the key of the element
+    @param options: RenderOptions
+        the settings values are formatted with
+    @param patch: list
+        the operations found so far'''
+
+    if (old.attributes == new.attributes and old._meta == new._meta and
+            old._transform == new._transform and
+            old._matrix == new._matrix and
+            old.load_defaults == new.load_defaults):
+        return
+
+    before = _attributes(old, options)
+    after = _attributes(new, options)
+    if before == after:
+        return
+
+    operation = {'op': 'attributes', 'target': key}
+
+    changed = dict((name, value) for name, value in after.iteritems()
+                   if before.get(name) != value)
+    if changed:
+        operation['set'] = changed
+
+    removed = sorted(name for name in before if name not in after)
+    if removed:
+        operation['remove'] = removed
+
+    patch.append(operation)
+
+def _diff_children(old, new, key, options, patch):
+    '''Add the operations turning one list of children into another to a
+    patch: the removals, from the last, then the insertions, from the
+    first, and then the changes to the children found in both lists.
+
+    @param old: list
+        the old children
+    @param new: list
+        the new children
+    @param key: str
+        the key of their parent
+    @param options: RenderOptions
+        the settings values are formatted with
+    @param patch: list
+        the operations found so far'''
+
+    if len(old) == len(new) and all(
+            _comparable(a, b) and _id(a) == _id(b) for a, b in izip(old, new)):
+        # nothing added, removed or moved
+        for j, (a, b) in enumerate(izip(old, new)):
+            _diff_element(a, b, _key(b, key, j), options, patch)
+        return
+
+    matches = _match(old, new)
+
+    # keep the longest run of matches in the same order in both lists, and
+    # move the rest by removing and inserting them
+    kept = _in_order(matches)
+    kept_old = set(i for i, _ in kept)
+    kept_new = set(j for _, j in kept)
+
+    for i in xrange(len(old) - 1, -1, -1):
+        if i not in kept_old:
+            patch.append({'op': 'remove',
+                          'target': _key(old[i], key, i)})
+
+    for j, child in enumerate(new):
+        if j not in kept_new:
+            patch.append({'op': 'insert', 'parent': key, 'index': j,
+                          'xml': _render(child, options)})
+
+    for i, j in kept:
+        _diff_element(old[i], new[j], _key(new[j], key, j), options, patch)
+
+def _match(old, new):
+    '''Return the pairs of positions of the children found in both lists,
+    matched by identity, then by id, then in order among the children of
+    the same kind without an id, ordered by their position in new.
+
+    @param old: list
+        the old children
+    @param new: list
+        the new children'''
+
+    by_object = {}
+    by_id = {}
+    anonymous = []
+    for i, child in enumerate(old):
+        by_object[id(child)] = i
+        name = _id(child)
+        if name is None:
+            anonymous.append(i)
+        else:
+            by_id[name] = i
+
+    used = set()
+    matches = []
+    others = []
+    for j, child in enumerate(new):
+        i = by_object.get(id(child))
+        if i is None:
+            name = _id(child)
+            if name is None:
+                others.append(j)
+                continue
+            i = by_id.get(name)
+            if i is None or not _comparable(old[i], child):
+                continue
+        if i not in used:
+            used.add(i)
+            matches.append((i, j))
+
+    # the children without an id are paired off in order, from both ends
+    # while they look the same, so that a child added or removed in the
+    # middle does not shift the rest
+    anonymous = [i for i in anonymous if i not in used]
+    n = min(len(anonymous), len(others))
+
+    start = 0
+    while start < n and _similar(old[anonymous[start]], new[others[start]]):
+        start += 1
+    end = 0
+    while (end < n - start and
+           _similar(old[anonymous[-1-end]], new[others[-1-end]])):
+        end += 1
+
+    pairs = zip(anonymous[:start], others[:start])
+    pairs += zip(anonymous[start:len(anonymous)-end],
+                 others[start:len(others)-end])
+    pairs += zip(anonymous[len(anonymous)-end:], others[len(others)-end:])
+    for i, j in pairs:
+        if _comparable(old[i], new[j]):
+            matches.append((i, j))
+
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+def _in_order(matches):
+    '''Return the longest subsequence of matches whose old positions are in
+    increasing order, as their new positions are.
+
+    @param matches: list
+        the (old, new) pairs of positions, ordered by new position'''
+
+    if all(matches[k][0] < matches[k+1][0] for k in xrange(len(matches) - 1)):
+        return matches
+
+    # patience sorting, keeping the predecessor of every match
+    tails = []
+    ends = []
+    previous = [None] * len(matches)
+    for k, (i, _) in enumerate(matches):
+        n = bisect.bisect_left(tails, i)
+        if n:
+            previous[k] = ends[n-1]
+        if n == len(tails):
+            tails.append(i)
+            ends.append(k)
+        else:
+            tails[n] = i
+            ends[n] = k
+
+    kept = []
+    k = ends[-1] if ends else None
+    while k is not None:
+        kept.append(matches[k])
+        k = previous[k]
+    kept.reverse()
+    return kept
+
+def _unchanged(old, new):
+    '''Return whether two elements are known to render the same without
+    looking at them: the same object, or a clone sharing its output with its
+    original.
+
+    @param old: SVGBase
+        the old element
+    @param new: SVGBase
+        the new element'''
+
+    if old is new:
+        return True
+
+    # clones share the cached output of their original until either changes
+    cache = old._cache
+    if cache is not None and cache is new._cache:
+        return True
+
+    # and their containers, which are copied before either changes
+    if (old.attributes is new.attributes and old._meta is new._meta and
+            old._transform is new._transform and old.content == new.content):
+        children = old._children
+        return children is new._children or (
+            type(children) is SharedChildren and children == new._children)
+
+    return False
+
+def _similar(old, new):
+    '''Return whether two elements look the same at a glance, with the same
+    kind, attributes and content.
+
+    @param old: SVGBase
+        the old element
+    @param new: SVGBase
+        the new element'''
+
+    return (_comparable(old, new) and old.content == new.content and
+            old.attributes == new.attributes)
+
+def _opaque(element):
+    '''Return whether an element writes its own output, rather than its
+    attributes, content and children.
+
+    @param element: SVGBase
+        the element'''
+
+    cls = type(element)
+    return (cls._iter.__func__ is not SVGBase._iter.__func__ or
+            cls._iter_render.__func__ is not SVGBase._iter_render.__func__)
+
+def _comparable(old, new):
+    '''Return whether one element can be turned into another by changing it,
+    rather than replacing it.
+
+    @param old: SVGBase
+        the old element
+    @param new: SVGBase
+        the new element'''
+
+    return type(old) is type(new) and old.TAG == new.TAG
+
+def _id(element):
+    '''Return the id of an element, or None if it has none.
+
+    @param element: SVGBase
+        the element'''
+
+    name = element.attributes.get('id')
+    return name if isinstance(name, basestring) else None
+
+def _key(element, parent, position):
+    '''Return the key of an element.
+
+    @param element: SVGBase
+        the element
+    @param parent: str
+        the key of its parent
+    @param position: int
+        its position among the children of its parent'''
+
+    name = _id(element)
+    if name is not None:
+        return '#' + name
+    return '{}/{}'.format(parent.rstrip('/'), position)
+
+def _attributes(element, options):
+    '''Return the attributes an element is written out with, formatted but
+    not escaped.
+
+    @param element: SVGBase
+        the element
+    @param options: RenderOptions
+        the settings values are formatted with'''
+
+    attributes = element._assemble_attributes(options, None)
+    element._run_renderers(attributes, options)
+
+    plain = options.values.plain
+    return dict((name, plain(value)) for name, value in attributes.iteritems())
+
+def _render(element, options):
+    '''Return the compact XML of an element.
+
+    @param element: SVGBase
+        the element
+    @param options: RenderOptions
+        the settings values are formatted with'''
+
+    return ''.join(element._iter(options, 0, None, None))
@@ -1,7 +1,12 @@
+import collections
 from functools import wraps
 import math
 
+import affine
+from attrs import Attribute
 from base import SVGBase
+from pathdata import ARC, CLOSE, CURVE, LINE, MOVE, PathData, render_path_data
+from simplify import simplify_points
 
 def requires_initalization(fn):
     '''A decorator for functions that require an initialized path. This will
@@ -27,7 +32,7 @@ def requires_open(fn):
 
     @wraps(fn)
     def wrapper(self, *args, **kwargs):
-        closed = object.__getattribute__(self, 'closed')
+        closed = self.closed
         if closed:
             raise ValueError('cannot call {} on a closed path'.format(fn.__name__))
 
@@ -39,10 +44,14 @@ class Path(SVGBase):
     
     The arc logic was taken from the libcairo library'''
 
+    __slots__ = ('pen', 'closed')
+
     TAG = 'path'
 
+    d = Attribute('d')
+
     RENDERERS = {
-        'd': ' '.join
+        'd': render_path_data
     }
 
     def __init__(self, **kwargs):
@@ -51,11 +60,71 @@ class Path(SVGBase):
         @param kwargs: keyword parameters
             additional metadata as key/value pairs'''
 
-        super(Path, self).__init__(d=list(), **kwargs)
+        super(Path, self).__init__(d=PathData(), **kwargs)
 
         object.__setattr__(self, 'pen', None)
         object.__setattr__(self, 'closed', False)
 
+    def bake(self, matrix, attributes):
+        '''Bake a similarity transformation into the points of the path.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this path'''
+
+        scale = affine.similarity_scale(matrix)
+        if scale is None:
+            return False
+
+        try:
+            data = self._path_data()
+        except (AttributeError, ValueError):
+            return False
+
+        if not self._bake_stroke(attributes, scale):
+            return False
+
+        attributes['d'] = data.transformed(matrix)
+        return True
+
+    def _path_data(self):
+        '''Return the commands of the path as a PathData, parsing them if the
+        'd' attribute was set as a string.'''
+
+        data = self.d
+        if isinstance(data, basestring):
+            data = PathData.parse(data)
+        return data
+
+    def local_bbox(self):
+        '''Return the bounding box of the path, or None if it is empty or its
+        'd' attribute was set as a string.'''
+
+        data = self.d
+        if not isinstance(data, PathData):
+            return None
+
+        return data.bounds()
+
+    def _data(self):
+        '''Return the command buffer of the path, to add commands to, copying
+        it first if it is shared with a clone.'''
+
+        if SVGBase._cloned:
+            self._own()
+        return self.d
+
+    def _unshare(self):
+        '''Replace the containers of the path, and its command buffer, which
+        are shared with a clone, by copies of them.'''
+
+        super(Path, self)._unshare()
+
+        data = self.attributes.get('d')
+        if isinstance(data, PathData):
+            self.attributes['d'] = data.copy()
+
     def _pen(self, x, y):
         '''Set the position of the pen.
 
@@ -75,8 +144,9 @@ class Path(SVGBase):
         @param y: float
             the y-coordinate of the new location of the pen'''
 
-        self.d.append('M {:f} {:f}'.format(x, y))
+        self._data().append(MOVE, (x, y))
         self._pen(x, y)
+        self.invalidate()
 
     @requires_initalization
     @requires_open
@@ -91,15 +161,103 @@ class Path(SVGBase):
         if (x, y) == self._pen:
             return
 
-        self.d.append('L {:f} {:f}'.format(x, y))
+        self._data().append(LINE, (x, y))
         self._pen(x, y)
+        self.invalidate()
+
+    @requires_initalization
+    @requires_open
+    def extend_lines(self, xs, ys):
+        '''Draw a series of connected lines from the current position through
+        each of the given points in turn. This is the bulk equivalent of
+        calling line_to for every point, and accepts any pair of equal length
+        sequences, such as lists, arrays or NumPy arrays.
+
+        @param xs: sequence
+            the x-coordinates of the points to draw lines to
+        @param ys: sequence
+            the y-coordinates of the points to draw lines to'''
+
+        if not len(xs):
+            return
+
+        self._data().extend_lines(xs, ys)
+        self._pen(xs[-1], ys[-1])
+        self.invalidate()
+
+    def simplify(self, tolerance=0.5, method='rdp'):
+        '''Simplify every run of straight lines in the path in place, removing
+        points that make no visible difference, and return a reference to the
+        path. Curves, moves and closes are kept as they are. Path data set
+        as a string is parsed first, raising ValueError if it is malformed.
+
+        @param tolerance: optional, float
+            for 'rdp', the largest distance a removed point may lie from the
+            simplified outline; for 'visvalingam', the smallest triangle area
+            a point must form with its neighbours to be kept
+        @param method: optional, str
+            'rdp' for Ramer-Douglas-Peucker, 'visvalingam' for
+            Visvalingam-Whyatt, or 'pixels' to keep only the points that can
+            change a pixel of the canvas the path is drawn on'''
+
+        data = self._path_data()
+        matrix = self.device_matrix() if method == 'pixels' else None
+
+        simplified = PathData()
+        commands = PathData.COMMANDS
+        coords = data.coords.tolist()
+
+        # the current run of lines, starting from the point the pen was at
+        # before the first of them, if there was one
+        xs, ys = [], []
+        anchored = False
+
+        def flush():
+            if len(xs) > 2:
+                keep = simplify_points(xs, ys, tolerance, method, matrix)
+            else:
+                keep = range(len(xs))
+
+            for i in keep[1:] if anchored else keep:
+                simplified.append(LINE, (xs[i], ys[i]))
+
+        i = 0
+        start = None
+        for op in data.ops:
+            n = commands[op][0]
+            args = coords[i:i+n]
+            i += n
+
+            if op == LINE:
+                xs.append(args[0])
+                ys.append(args[1])
+                continue
+
+            flush()
+            simplified.append(op, args)
+
+            if op == MOVE:
+                start = args
+
+            anchor = start if op == CLOSE else args[-2:]
+            anchored = anchor is not None
+            xs[:] = anchor[:1] if anchored else []
+            ys[:] = anchor[1:] if anchored else []
+
+        flush()
+
+        if len(simplified.ops) < len(data.ops):
+            self.d = simplified
+
+        return self
 
     @requires_open
     def close(self):
         '''Close the path. This prevents any further modifications.'''
 
-        self.d.append('Z')
+        self._data().append(CLOSE)
         object.__setattr__(self, 'closed', True)
+        self.invalidate()
 
     @requires_initalization
     @requires_open
@@ -125,44 +283,14 @@ class Path(SVGBase):
         @param y: float  
             the y-coordinate for the destination position'''
         
-        self.d.append('C {:f} {:f} {:f} {:f} {:f} {:f}'.format(x1, y1, x2, y2, x, y))
+        self._data().append(CURVE, (x1, y1, x2, y2, x, y))
         self._pen(x, y)
+        self.invalidate()
 
     @requires_initalization
     @requires_open
-    def _arc_segment(self, cx, cy, radius, theta1, theta2):
-        '''Draw a circular arc (a portion of the circumference of a circle. 
-        Angles are specified in radians, where 0 is at three o'clock and the
-        positive direction is clockwise.
-
-        @param cx: float
-            the x-coordinate of the center of the circle
-        @param cy: float
-            the y-coordinate of the center of the circle
-        @param radius: float
-            the radius of the circle
-        @param theta1: float
-            the starting angle of the arc
-        @param theta2: float
-            the finishing angle of the arc'''
-        
-        r_sin_1 = radius * math.sin(theta1)
-        r_cos_1 = radius * math.cos(theta1)
-        r_sin_2 = radius * math.sin(theta2)
-        r_cos_2 = radius * math.cos(theta2)
-
-        h = 4.0/3.0 * math.tan((theta2 - theta1) / 4.0)
-
-        self.curve_to(cx + r_cos_1 - h * r_sin_1,
-                      cy + r_sin_1 + h * r_cos_1,
-                      cx + r_cos_2 + h * r_sin_2,
-                      cy + r_sin_2 - h * r_cos_2,
-                      cx + r_cos_2,
-                      cy + r_sin_2)
-
-    @requires_initalization
-    @requires_open
-    def arc(self, cx, cy, radius, theta1, theta2, radians=False, max_segment_theta=math.pi/2):
+    def arc(self, cx, cy, radius, theta1, theta2, radians=False,
+            max_segment_theta=math.pi/2, tolerance=None, native=False):
         '''Draw a circular arc (a portion of the circumference of a circle. 
         Angles are specified in degrees, unless the keyword argument 'radians'
         is set to true. The angle with value 0 is at three o'clock and the
@@ -182,7 +310,14 @@ class Path(SVGBase):
             the finishing angle of the arc
         @param max_segment_theta: float
             the maximum angle a curve can subtend - any requests that span more
-            than this value will be broken up into multiple curves'''
+            than this value will be broken up into multiple curves
+        @param tolerance: optional, float
+            if given, the largest distance in device pixels the curves may
+            stray from the true arc - as few curves are used as this allows,
+            and max_segment_theta is ignored
+        @param native: optional, bool
+            draw the arc with the SVG 'A' command rather than approximating it
+            with curves, which is exact and much smaller'''
 
         if not radians:
             theta1 = math.radians(theta1)
@@ -192,14 +327,149 @@ class Path(SVGBase):
                      cy + radius * math.sin(theta1))
 
         d_theta = theta2 - theta1
-        if d_theta != 0.0:
+        if d_theta == 0.0 or radius == 0:
+            return
 
+        if native:
+            self._native_arc(cx, cy, radius, theta1, d_theta)
+            return
+
+        if tolerance is not None:
+            n_segments = arc_segments(abs(d_theta), abs(radius) * self._device_scale(),
+                                      tolerance)
+        else:
             n_segments = int(math.ceil(abs(d_theta) / max_segment_theta))
 
-            theta = theta1
-            theta_step = d_theta / n_segments
+        # the curves of the arc on the unit circle, scaled and moved into
+        # place and added in one go, without a curve_to call for each
+        unit = unit_arc(theta1, theta2, n_segments)
+        coords = [cy + radius * v if i % 2 else cx + radius * v
+                  for i, v in enumerate(unit)]
 
-            for i in xrange(n_segments):
-                self._arc_segment(cx, cy, radius, theta, theta + theta_step)
-                theta += theta_step
+        self._data().extend_curves(coords)
+        self._pen(coords[-2], coords[-1])
+        self.invalidate()
 
+    def _native_arc(self, cx, cy, radius, theta1, d_theta):
+        '''Draw a circular arc from the current position with 'A' commands,
+        one for each half turn or part of one it sweeps through, since an arc
+        that ends where it starts is not drawn and a single command cannot
+        sweep through more than a full turn.
+
+        @param cx: float
+            the x-coordinate of the center of the circle
+        @param cy: float
+            the y-coordinate of the center of the circle
+        @param radius: float
+            the radius of the circle
+        @param theta1: float
+            the starting angle of the arc, in radians
+        @param d_theta: float
+            the angle the arc subtends, in radians, negative for clockwise'''
+
+        n_segments = max(1, int(math.ceil(abs(d_theta) / math.pi)))
+        step = d_theta / n_segments
+        large = 1 if abs(step) > math.pi else 0
+        sweep = 1 if step > 0 else 0
+
+        theta = theta1
+        for i in xrange(n_segments):
+            theta += step
+            x = cx + radius * math.cos(theta)
+            y = cy + radius * math.sin(theta)
+            self._data().append(ARC, (radius, radius, 0, large, sweep, x, y))
+
+        self._pen(x, y)
+        self.invalidate()
+
+    def _device_scale(self):
+        '''Return the factor by which lengths drawn in this path are scaled
+        on the device, the geometric mean of the scales along each axis.'''
+
+        matrix = self.device_matrix()
+        if matrix is None:
+            return 1.0
+
+        return math.sqrt(abs(affine.determinant(matrix)))
+
+# the unit circle arcs computed so far, and the most kept before the oldest
+# half is dropped
+_unit_arcs = {}
+_unit_arcs_order = collections.deque()
+UNIT_ARC_CACHE_SIZE = 1024
+
+def unit_arc(theta1, theta2, n_segments):
+    '''Return the control and end points of the cubic Bezier curves
+    approximating an arc of the unit circle centered on the origin, as a flat
+    tuple of six coordinates per curve. Arcs are cached, since charts tend to
+    draw the same angles over and over at different sizes and positions.
+
+    @param theta1: float
+        the starting angle of the arc, in radians
+    @param theta2: float
+        the finishing angle of the arc, in radians
+    @param n_segments: int
+        the number of curves to split the arc into'''
+
+    key = (theta1, theta2, n_segments)
+    coords = _unit_arcs.get(key)
+    if coords is not None:
+        return coords
+
+    step = (theta2 - theta1) / n_segments
+    h = 4.0/3.0 * math.tan(step / 4.0)
+
+    coords = []
+    sin_1, cos_1 = math.sin(theta1), math.cos(theta1)
+    for i in xrange(n_segments):
+        theta = theta1 + (i + 1) * step
+        sin_2, cos_2 = math.sin(theta), math.cos(theta)
+        coords.extend((cos_1 - h * sin_1, sin_1 + h * cos_1,
+                       cos_2 + h * sin_2, sin_2 - h * cos_2,
+                       cos_2, sin_2))
+        sin_1, cos_1 = sin_2, cos_2
+
+    if len(_unit_arcs_order) >= UNIT_ARC_CACHE_SIZE:
+        for _ in xrange(UNIT_ARC_CACHE_SIZE // 2):
+            del _unit_arcs[_unit_arcs_order.popleft()]
+
+    coords = tuple(coords)
+    _unit_arcs[key] = coords
+    _unit_arcs_order.append(key)
+    return coords
+
+def arc_error(theta):
+    '''Return the largest distance between a unit circle arc and the cubic
+    Bezier curve approximating it.
+
+    @param theta: float
+        the angle the arc subtends, in radians'''
+
+    quarter = theta / 4.0
+    return 4.0 / 27.0 * math.sin(quarter) ** 6 / math.cos(quarter) ** 2
+
+def arc_segments(theta, radius, tolerance):
+    '''Return the fewest cubic Bezier curves an arc can be split into while
+    staying within a distance of tolerance of it.
+
+    @param theta: float
+        the angle the arc subtends, in radians
+    @param radius: float
+        the radius of the arc
+    @param tolerance: float
+        the largest distance allowed between the curves and the arc'''
+
+    if tolerance <= 0:
+        raise ValueError('tolerance must be positive')
+
+    # the error grows with the sixth power of the angle, so start from that
+    # estimate and correct it for the larger angles it is less exact at
+    n = max(1, int(math.ceil(theta / 4.0 / (6.75 * tolerance / radius) ** (1 / 6.0))))
+    n = max(n, int(math.ceil(theta / math.pi)))
+    while radius * arc_error(theta / n) > tolerance:
+        n += 1
+    while n > 1 and theta / (n - 1) <= math.pi and \
+            radius * arc_error(theta / (n - 1)) <= tolerance:
+        n -= 1
+
+    return n
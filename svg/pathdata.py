@@ -0,0 +1,571 @@
+from array import array
+from itertools import chain, izip
+import math
+import re
+
+import bounds
+
+# the number of decimal places kept by compact path data, unless told
+# otherwise
+DEFAULT_PRECISION = 6
+
+# the opcodes stored in a path's command buffer
+MOVE = ord('M')
+LINE = ord('L')
+CURVE = ord('C')
+CLOSE = ord('Z')
+ARC = ord('A')
+
+# the tokens of the path data grammar
+_COMMAND = re.compile(r'[\s,]*([MmZzLlHhVvCcSsQqTtAa])')
+_NUMBER = re.compile(r'[\s,]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+_FLAG = re.compile(r'[\s,]*([01])')
+
+# the number of arguments each command takes
+_ARGUMENTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2,
+              'A': 7, 'Z': 0}
+
+class PathData(object):
+    '''The numeric command buffer behind a path's 'd' attribute. Commands are
+    kept as one opcode byte each in a compact array, and their coordinates in
+    a flat array of doubles. Nothing is formatted until the path is
+    rendered.'''
+
+    __slots__ = ('ops', 'coords')
+
+    # the number of coordinates each command consumes, and its format string
+    COMMANDS = {
+        MOVE: (2, 'M %f %f'),
+        LINE: (2, 'L %f %f'),
+        CURVE: (6, 'C %f %f %f %f %f %f'),
+        CLOSE: (0, 'Z'),
+        ARC: (7, 'A %f %f %f %d %d %f %f'),
+    }
+
+    def __init__(self):
+        '''Create an empty command buffer.'''
+
+        self.ops = array('B')
+        self.coords = array('d')
+
+    @classmethod
+    def parse(cls, text):
+        '''Create a buffer from the value of an SVG 'd' attribute. Relative
+        commands are made absolute, horizontal and vertical lines become
+        lines, and smooth and quadratic curves become cubic curves, so that
+        only the commands of the buffer are left. Raises ValueError if the
+        path data is malformed.
+
+        @param text: str
+            the path data'''
+
+        d = cls()
+        append = d.append
+
+        x = y = startx = starty = 0.0
+        # the last control point of a cubic or quadratic curve, for smooth
+        # curves following them
+        cubic = quadratic = None
+
+        pos = 0
+        end = len(text.rstrip())
+        while pos < end:
+            match = _COMMAND.match(text, pos)
+            if match is None:
+                raise ValueError('bad path data at {}: {!r}'.format(
+                    pos, text[pos:pos+20]))
+            letter = match.group(1)
+            pos = match.end()
+
+            command = letter.upper()
+            relative = letter != command
+
+            if command == 'Z':
+                append(CLOSE)
+                x, y = startx, starty
+                cubic = quadratic = None
+                continue
+
+            first = True
+            while first or (pos < end and _NUMBER.match(text, pos)):
+                args, pos = _arguments(text, pos, command)
+                dx, dy = (x, y) if relative else (0.0, 0.0)
+                last_cubic = cubic
+                last_quadratic = quadratic
+                cubic = quadratic = None
+
+                if command == 'M':
+                    x, y = args[0] + dx, args[1] + dy
+                    if first:
+                        append(MOVE, (x, y))
+                        startx, starty = x, y
+                    else:
+                        append(LINE, (x, y))
+                elif command == 'L':
+                    x, y = args[0] + dx, args[1] + dy
+                    append(LINE, (x, y))
+                elif command == 'H':
+                    x = args[0] + dx
+                    append(LINE, (x, y))
+                elif command == 'V':
+                    y = args[0] + dy
+                    append(LINE, (x, y))
+                elif command == 'C' or command == 'S':
+                    if command == 'C':
+                        x1, y1 = args[0] + dx, args[1] + dy
+                        args = args[2:]
+                    elif last_cubic is None:
+                        x1, y1 = x, y
+                    else:
+                        x1, y1 = 2 * x - last_cubic[0], 2 * y - last_cubic[1]
+                    x2, y2 = args[0] + dx, args[1] + dy
+                    x, y = args[2] + dx, args[3] + dy
+                    append(CURVE, (x1, y1, x2, y2, x, y))
+                    cubic = (x2, y2)
+                elif command == 'Q' or command == 'T':
+                    if command == 'Q':
+                        qx, qy = args[0] + dx, args[1] + dy
+                        args = args[2:]
+                    elif last_quadratic is None:
+                        qx, qy = x, y
+                    else:
+                        qx = 2 * x - last_quadratic[0]
+                        qy = 2 * y - last_quadratic[1]
+                    x0, y0 = x, y
+                    x, y = args[0] + dx, args[1] + dy
+                    append(CURVE, (x0 + 2.0 / 3 * (qx - x0),
+                                   y0 + 2.0 / 3 * (qy - y0),
+                                   x + 2.0 / 3 * (qx - x),
+                                   y + 2.0 / 3 * (qy - y), x, y))
+                    quadratic = (qx, qy)
+                else:
+                    rx, ry, rotation, large, sweep = args[:5]
+                    x, y = args[5] + dx, args[6] + dy
+                    append(ARC, (rx, ry, rotation, large, sweep, x, y))
+
+                first = False
+
+        return d
+
+    def copy(self):
+        '''Return a copy of the buffer.'''
+
+        data = PathData()
+        data.ops = array('B', self.ops)
+        data.coords = array('d', self.coords)
+        return data
+
+    def __getstate__(self):
+        '''Return the state of the buffer for pickling.'''
+
+        return self.ops, self.coords
+
+    def __setstate__(self, state):
+        '''Restore the state of the buffer after unpickling.
+
+        @param state: tuple
+            the state returned by __getstate__'''
+
+        self.ops, self.coords = state
+
+    def __eq__(self, other):
+        '''Return whether another buffer holds the same commands.
+
+        @param other: object
+            the other buffer'''
+
+        if not isinstance(other, PathData):
+            return NotImplemented
+        return self.ops == other.ops and self.coords == other.coords
+
+    def __ne__(self, other):
+        '''Return whether another buffer holds different commands.
+
+        @param other: object
+            the other buffer'''
+
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    # buffers are changed in place, so they cannot be hashed by value
+    __hash__ = None
+
+    def __len__(self):
+        '''Return the number of commands in the buffer.'''
+
+        return len(self.ops)
+
+    def __iter__(self):
+        '''Iterate over the commands in the buffer, as (command, coordinates)
+        pairs, where command is the single letter SVG command.'''
+
+        commands = self.COMMANDS
+        coords = self.coords.tolist()
+        i = 0
+        for op in self.ops:
+            n = commands[op][0]
+            yield chr(op), coords[i:i+n]
+            i += n
+
+    def append(self, op, coords=()):
+        '''Add a command to the end of the buffer.
+
+        @param op: int
+            the opcode of the command
+        @param coords: optional, tuple
+            the coordinates of the command'''
+
+        self.ops.append(op)
+        self.coords.extend(coords)
+
+    def extend_lines(self, xs, ys):
+        '''Add a line command for every point in the parallel sequences xs and
+        ys, in bulk.
+
+        @param xs: sequence
+            the x-coordinates of the points
+        @param ys: sequence
+            the y-coordinates of the points'''
+
+        if len(xs) != len(ys):
+            raise ValueError('xs and ys must be of the same length')
+
+        self.ops.extend(array('B', [LINE]) * len(xs))
+        self.coords.extend(chain.from_iterable(izip(xs, ys)))
+
+    def extend_curves(self, coords):
+        '''Add a cubic Bezier curve command for every six coordinates in a
+        flat sequence, in bulk.
+
+        @param coords: sequence
+            the control and end points of the curves, six coordinates each'''
+
+        if len(coords) % 6:
+            raise ValueError('curves take six coordinates each')
+
+        self.ops.extend(array('B', [CURVE]) * (len(coords) // 6))
+        self.coords.extend(coords)
+
+    def transformed(self, matrix):
+        '''Return a copy of the buffer with every point transformed by an
+        affine matrix.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix'''
+
+        a, b, c, d, e, f = matrix
+
+        data = PathData()
+        data.ops = array('B', self.ops)
+
+        if ARC not in self.ops:
+            coords = self.coords
+            xs = coords[0::2]
+            ys = coords[1::2]
+
+            data.coords = array('d', chain.from_iterable(
+                (a * x + c * y + e, b * x + d * y + f) for x, y in izip(xs, ys)))
+            return data
+
+        # arcs keep their radii and flags apart from their end point, and can
+        # only follow a similarity, which keeps circles circular
+        scale = math.hypot(a, b)
+        if abs(math.hypot(c, d) - scale) > 1e-9 * max(scale, 1.0):
+            raise ValueError('paths with arcs can only be transformed by '
+                             'similarities')
+
+        rotation = math.degrees(math.atan2(b, a))
+        reflected = a * d - b * c < 0
+
+        coords = []
+        for op, args in self:
+            if op == 'A':
+                rx, ry, phi, large, sweep, x, y = args
+                if reflected:
+                    phi, sweep = rotation - phi, 1 - sweep
+                else:
+                    phi += rotation
+                coords.extend((rx * scale, ry * scale, phi, large, sweep,
+                               a * x + c * y + e, b * x + d * y + f))
+            else:
+                for x, y in izip(args[0::2], args[1::2]):
+                    coords.extend((a * x + c * y + e, b * x + d * y + f))
+
+        data.coords = array('d', coords)
+        return data
+
+    def bounds(self):
+        '''Return the bounding box of the path, as an (xmin, ymin, xmax, ymax)
+        tuple, or None if it is empty. Curves and arcs are bounded by their
+        turning points rather than their control points, so the box is
+        tight.'''
+
+        commands = self.COMMANDS
+        coords = self.coords.tolist()
+
+        xs, ys = [], []
+
+        # the current point, and the start of the current subpath
+        x0 = y0 = 0.0
+        start = (0.0, 0.0)
+
+        i = 0
+        for op in self.ops:
+            n = commands[op][0]
+            if op == CURVE:
+                x1, y1, x2, y2, x3, y3 = coords[i:i+6]
+                xs.extend(bounds.cubic_extrema(x0, x1, x2, x3))
+                ys.extend(bounds.cubic_extrema(y0, y1, y2, y3))
+            elif op == ARC:
+                box = bounds.arc((x0, y0), *coords[i:i+7])
+                xs.extend(box[0::2])
+                ys.extend(box[1::2])
+            elif op == CLOSE:
+                x0, y0 = start
+            if n:
+                x0, y0 = coords[i+n-2:i+n]
+                xs.append(x0)
+                ys.append(y0)
+                if op == MOVE:
+                    start = (x0, y0)
+            i += n
+
+        return bounds.from_points(xs, ys)
+
+    def compact(self, precision=None):
+        '''Format the buffer as the shortest 'd' attribute this encoder can
+        find. Every segment is written with absolute or relative coordinates,
+        whichever is shorter, repeated command letters are left implicit,
+        lines and curves use the H, V and S shorthands where they apply, and
+        numbers are rounded to a fixed number of decimal places with
+        redundant zeros and separators removed.
+
+        @param precision: optional, int
+            the number of decimal places to keep, 6 if not given'''
+
+        places = DEFAULT_PRECISION if precision is None else precision
+
+        def number(value):
+            return format_number(value, places)
+
+        encoder = _CompactEncoder()
+
+        # the current point, the start of the current subpath and the second
+        # control point of the previous curve, all rounded
+        cx = cy = sx = sy = 0.0
+        control = None
+
+        for op, args in self:
+            args = [round(v, places) for v in args]
+
+            if op == 'M':
+                x, y = args
+                encoder.write(('M', map(number, args)),
+                              ('m', [number(x - cx), number(y - cy)]))
+                cx, cy = sx, sy = x, y
+                control = None
+
+            elif op == 'L':
+                x, y = args
+                if y == cy:
+                    encoder.write(('H', [number(x)]),
+                                  ('h', [number(x - cx)]))
+                elif x == cx:
+                    encoder.write(('V', [number(y)]),
+                                  ('v', [number(y - cy)]))
+                else:
+                    encoder.write(('L', map(number, args)),
+                                  ('l', [number(x - cx), number(y - cy)]))
+                cx, cy = x, y
+                control = None
+
+            elif op == 'C':
+                x1, y1, x2, y2, x, y = args
+                relative = [x1 - cx, y1 - cy, x2 - cx, y2 - cy, x - cx, y - cy]
+
+                # the first control point may be left out if it reflects the
+                # second control point of the previous curve
+                if (control is not None and
+                        round(2 * cx - control[0], places) == x1 and
+                        round(2 * cy - control[1], places) == y1):
+                    encoder.write(('S', map(number, args[2:])),
+                                  ('s', map(number, relative[2:])))
+                else:
+                    encoder.write(('C', map(number, args)),
+                                  ('c', map(number, relative)))
+                cx, cy = x, y
+                control = (x2, y2)
+
+            elif op == 'A':
+                rx, ry, phi, large, sweep, x, y = args
+                shape = map(number, (rx, ry, phi, large, sweep))
+                encoder.write(('A', shape + [number(x), number(y)]),
+                              ('a', shape + [number(x - cx), number(y - cy)]))
+                cx, cy = x, y
+                control = None
+
+            elif op == 'Z':
+                encoder.write(('z', []))
+                cx, cy = sx, sy
+                control = None
+
+        return encoder.getvalue()
+
+    def render(self, options=None):
+        '''Format the buffer as the value of an SVG 'd' attribute, for the
+        given render settings.
+
+        @param options: optional, RenderOptions
+            the settings of the render'''
+
+        if options is not None and options.path_data == 'compact':
+            return self.compact(options.precision)
+
+        return str(self)
+
+    def __str__(self):
+        '''Format the buffer as the value of an SVG 'd' attribute.'''
+
+        commands = self.COMMANDS
+        coords = self.coords.tolist()
+        parts = []
+        i = 0
+        for op in self.ops:
+            n, fmt = commands[op]
+            parts.append(fmt % tuple(coords[i:i+n]) if n else fmt)
+            i += n
+
+        return ' '.join(parts)
+
+class _CompactEncoder(object):
+    '''Accumulates compact path data, one segment at a time, choosing the
+    shortest of the ways each segment can be written.'''
+
+    # the command implied by a repeated set of coordinates after each command
+    IMPLICIT = {'M': 'L', 'm': 'l'}
+
+    def __init__(self):
+        '''Create an empty encoder.'''
+
+        self.parts = []
+        self.command = None
+        self.number = None
+
+    def _encode(self, command, numbers):
+        '''Return the text for a segment, given what has been written so far.
+
+        @param command: str
+            the command letter of the segment
+        @param numbers: list
+            the formatted numbers of the segment'''
+
+        implicit = self.IMPLICIT.get(self.command, self.command)
+
+        parts = []
+        previous = None
+        if command != implicit or not numbers:
+            parts.append(command)
+        else:
+            previous = self.number
+
+        for number in numbers:
+            if previous is not None and not _joins(previous, number):
+                parts.append(' ')
+            parts.append(number)
+            previous = number
+
+        return ''.join(parts)
+
+    def write(self, *candidates):
+        '''Write a segment, in the shortest of the candidate forms.
+
+        @param candidates: positional parameters
+            the forms of the segment, as (command, numbers) pairs'''
+
+        best = None
+        for command, numbers in candidates:
+            text = self._encode(command, numbers)
+            if best is None or len(text) < len(best[0]):
+                best = (text, command, numbers)
+
+        text, command, numbers = best
+        self.parts.append(text)
+        self.command = command
+        self.number = numbers[-1] if numbers else None
+
+    def getvalue(self):
+        '''Return everything written so far.'''
+
+        return ''.join(self.parts)
+
+def _arguments(text, pos, command):
+    '''Read the arguments of one path command, returning them as a list of
+    floats together with the position after them.
+
+    @param text: str
+        the path data
+    @param pos: int
+        the position to start reading at
+    @param command: str
+        the upper case letter of the command'''
+
+    args = []
+    for i in xrange(_ARGUMENTS[command]):
+        # the flags of an arc are single digits, and need not be separated
+        pattern = _FLAG if command == 'A' and i in (3, 4) else _NUMBER
+        match = pattern.match(text, pos)
+        if match is None:
+            raise ValueError('bad path data at {}: {!r}'.format(
+                pos, text[pos:pos+20]))
+        args.append(float(match.group(1)))
+        pos = match.end()
+
+    return args, pos
+
+def _joins(previous, number):
+    '''Return whether two numbers can be written without a separator, which
+    is when the second starts with a sign, or with a decimal point while the
+    first already has one.
+
+    @param previous: str
+        the number written before
+    @param number: str
+        the number about to be written'''
+
+    return number[0] == '-' or (number[0] == '.' and '.' in previous)
+
+def format_number(value, places):
+    '''Format a number with at most a fixed number of decimal places, and
+    without trailing zeros, a leading zero or a negative zero.
+
+    @param value: float
+        the number to format
+    @param places: int
+        the number of decimal places to keep'''
+
+    text = '%.*f' % (places, value)
+
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+
+    if text.startswith('0.'):
+        text = text[1:]
+    elif text.startswith('-0.'):
+        text = '-' + text[2:]
+    elif text == '-0':
+        text = '0'
+
+    return text
+
+def render_path_data(value, options):
+    '''Format the value of a 'd' attribute for output. Values set as strings
+    are written out unchanged.
+
+    @param value: PathData or str
+        the path data
+    @param options: RenderOptions
+        the settings of the render, or None'''
+
+    if isinstance(value, PathData):
+        return value.render(options)
+    return value
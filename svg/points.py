@@ -0,0 +1,339 @@
+from array import array
+from itertools import chain, izip
+import mmap
+import struct
+
+import bounds
+
+class PointBuffer(object):
+    '''The numeric storage behind the 'points' attribute of polylines and
+    polygons. Points are kept as interleaved x and y coordinates in a flat
+    array of doubles, and only formatted when the element is rendered.
+
+    Buffers can also wrap points held elsewhere without copying them - an
+    (N, 2) NumPy array, two parallel arrays of x and y coordinates, or any
+    object exposing native doubles through the buffer protocol - see wrap.
+    The points are then only read when they are rendered or measured, so
+    later changes to the source show up in the output.'''
+
+    __slots__ = ('coords', 'y_coords')
+
+    # the format of a single point - matches str() for floats, but without the
+    # trailing '.0' on integral values
+    POINT_FORMAT = '%.12g,%.12g'
+
+    def __init__(self, points=()):
+        '''Create the buffer.
+
+        @param points: optional, iterable
+            the points, as (x,y) pairs'''
+
+        # interleaved coordinates, or the x-coordinates if y_coords is set
+        self.coords = array('d', chain.from_iterable(points))
+        self.y_coords = None
+
+    @classmethod
+    def wrap(cls, source, ys=None):
+        '''Create a buffer over points held in another object, without
+        copying them.
+
+        @param source: object
+            an (N, 2) array, a flat array of interleaved coordinates, or any
+            object exposing native doubles through the buffer protocol, such
+            as an array('d'), bytearray or mmap - or, if ys is given, the
+            x-coordinates
+        @param ys: optional, object
+            the y-coordinates, in parallel with the x-coordinates in source'''
+
+        buffer = cls.__new__(cls)
+
+        if ys is not None:
+            xs, ys = _sequence(source), _sequence(ys)
+            if len(xs) != len(ys):
+                raise ValueError('the x and y coordinates differ in number')
+            buffer.coords = xs
+            buffer.y_coords = ys
+            return buffer
+
+        shape = getattr(source, 'shape', None)
+        if shape is not None and len(shape) == 2:
+            if shape[1] != 2:
+                raise ValueError('point arrays must have two columns')
+            # a view for contiguous arrays, a copy otherwise
+            source = source.reshape(-1)
+
+        coords = _sequence(source)
+        if len(coords) % 2:
+            raise ValueError('points need an even number of coordinates')
+
+        buffer.coords = coords
+        buffer.y_coords = None
+        return buffer
+
+    @staticmethod
+    def is_source(value):
+        '''Return whether a value is something wrap accepts on its own, rather
+        than a single point.
+
+        @param value: object
+            the value'''
+
+        return (hasattr(value, 'shape') or
+                isinstance(value, (array, bytearray, buffer, mmap.mmap)))
+
+    @classmethod
+    def parse(cls, text):
+        '''Create a buffer from the value of an SVG 'points' attribute.
+
+        @param text: str
+            the points, as whitespace separated x,y pairs'''
+
+        values = text.replace(',', ' ').split()
+
+        buffer = cls()
+        buffer.coords = array('d', (float(v) for v in values))
+        return buffer
+
+    def __getstate__(self):
+        '''Return the state of the buffer for pickling, with wrapped points
+        copied into an array.'''
+
+        coords = self.coords
+        if self.y_coords is not None or type(coords) is not array:
+            coords = array('d', self.flat())
+        return (coords,)
+
+    def __setstate__(self, state):
+        '''Restore the state of the buffer after unpickling.
+
+        @param state: tuple
+            the state returned by __getstate__'''
+
+        self.coords, = state
+        self.y_coords = None
+
+    def __eq__(self, other):
+        '''Return whether another buffer holds the same points.
+
+        @param other: object
+            the other buffer'''
+
+        if not isinstance(other, PointBuffer):
+            return NotImplemented
+        return list(self.flat()) == list(other.flat())
+
+    def __ne__(self, other):
+        '''Return whether another buffer holds different points.
+
+        @param other: object
+            the other buffer'''
+
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    # wrapped points can change under the buffer, so it cannot be hashed by
+    # value
+    __hash__ = None
+
+    def __len__(self):
+        '''Return the number of points in the buffer.'''
+
+        if self.y_coords is not None:
+            return len(self.y_coords)
+        return len(self.coords) // 2
+
+    def __iter__(self):
+        '''Iterate over the points in the buffer, as (x,y) pairs.'''
+
+        if self.y_coords is not None:
+            return izip(_list(self.coords), _list(self.y_coords))
+
+        coords = iter(_list(self.coords))
+        return izip(coords, coords)
+
+    def flat(self):
+        '''Return the coordinates of the points, interleaved, as a list or
+        tuple of floats.'''
+
+        if self.y_coords is not None:
+            coords = [None] * (2 * len(self.y_coords))
+            coords[0::2] = _list(self.coords)
+            coords[1::2] = _list(self.y_coords)
+            return coords
+
+        return _list(self.coords)
+
+    @property
+    def xs(self):
+        '''A list of the x-coordinates of the points.'''
+
+        if self.y_coords is not None:
+            return list(_list(self.coords))
+        return list(self.flat()[0::2])
+
+    @property
+    def ys(self):
+        '''A list of the y-coordinates of the points.'''
+
+        if self.y_coords is not None:
+            return list(_list(self.y_coords))
+        return list(self.flat()[1::2])
+
+    def bounds(self):
+        '''Return the bounding box of the points, as an (xmin, ymin, xmax,
+        ymax) tuple, or None if there are none.'''
+
+        return bounds.from_points(self.xs, self.ys)
+
+    def select(self, indices):
+        '''Return a new buffer holding only the points at the given indices.
+
+        @param indices: iterable
+            the indices of the points to keep, in order'''
+
+        coords = self.flat()
+
+        buffer = PointBuffer()
+        buffer.coords = array('d', chain.from_iterable(
+            (coords[2*i], coords[2*i+1]) for i in indices))
+        return buffer
+
+    def transformed(self, matrix):
+        '''Return a copy of the buffer with every point transformed by an
+        affine matrix.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix'''
+
+        a, b, c, d, e, f = matrix
+
+        buffer = PointBuffer()
+        buffer.coords = array('d', chain.from_iterable(
+            (a * x + c * y + e, b * x + d * y + f) for x, y in self))
+        return buffer
+
+    def __str__(self):
+        '''Format the buffer as the value of an SVG 'points' attribute. Every
+        point is formatted by a single string operation over the whole
+        buffer.'''
+
+        coords = self.flat()
+        if not coords:
+            return ''
+
+        return ' '.join([self.POINT_FORMAT] * (len(coords) // 2)) % tuple(coords)
+
+    def render(self, options=None):
+        '''Format the buffer as the value of an SVG 'points' attribute, for the
+        given render settings.
+
+        @param options: optional, RenderOptions
+            the settings of the render'''
+
+        if options is None or options.values.exact:
+            return str(self)
+
+        number = options.values.number
+        return ' '.join(['%s,%s' % (number(x), number(y)) for x, y in self])
+
+class _Doubles(object):
+    '''A read-only view of the native doubles held by an object exposing the
+    buffer protocol, which are only unpacked when they are read.'''
+
+    __slots__ = ('data',)
+
+    def __init__(self, source):
+        '''Create the view.
+
+        @param source: object
+            the object holding the doubles'''
+
+        data = buffer(source)
+        if len(data) % 8:
+            raise ValueError('buffers of points must hold whole doubles')
+        self.data = data
+
+    def __len__(self):
+        '''Return the number of doubles.'''
+
+        return len(self.data) // 8
+
+    def tolist(self):
+        '''Return the doubles as a tuple.'''
+
+        return struct.unpack_from('{}d'.format(len(self)), self.data)
+
+def _sequence(source):
+    '''Return a sequence of numbers for the coordinates held by an object,
+    without copying them.
+
+    @param source: object
+        an array or any object exposing native doubles through the buffer
+        protocol, or else a sequence of numbers'''
+
+    if isinstance(source, array):
+        return source
+
+    if hasattr(source, 'tolist') or not isinstance(
+            source, (bytearray, buffer, mmap.mmap, str)):
+        return source
+
+    return _Doubles(source)
+
+def _list(sequence):
+    '''Return the numbers in a sequence as a list or tuple of Python floats,
+    in a single pass where the sequence can convert itself.
+
+    @param sequence: object
+        the sequence'''
+
+    tolist = getattr(sequence, 'tolist', None)
+    if tolist is not None:
+        return tolist()
+    return list(sequence)
+
+def from_arguments(args, kwargs):
+    '''Return the points given to a polyline or polygon constructor, taking
+    the keyword arguments that describe them out of kwargs.
+
+    @param args: tuple
+        the positional arguments - (x,y) pairs, a single source for wrap, or
+        two sources holding the x-coordinates and y-coordinates
+    @param kwargs: dict
+        the keyword arguments, which may hold the x-coordinates and
+        y-coordinates as xs and ys, or the points as points'''
+
+    if 'xs' in kwargs or 'ys' in kwargs:
+        return PointBuffer.wrap(kwargs.pop('xs'), kwargs.pop('ys'))
+
+    if 'points' in kwargs:
+        points = kwargs.pop('points')
+        if isinstance(points, (basestring, PointBuffer)):
+            return points
+        if PointBuffer.is_source(points):
+            return PointBuffer.wrap(points)
+        return PointBuffer(points)
+
+    sources = sum(1 for arg in args if PointBuffer.is_source(arg))
+    if sources:
+        if len(args) == 1:
+            return PointBuffer.wrap(args[0])
+        if len(args) == 2 and sources == 2:
+            return PointBuffer.wrap(args[0], args[1])
+        raise TypeError('give points as (x,y) pairs, one source of '
+                        'coordinates, or two sources of x and y coordinates')
+
+    return PointBuffer(args)
+
+def render_points(value, options):
+    '''Format the value of a 'points' attribute for output. Values set as
+    strings are written out unchanged.
+
+    @param value: PointBuffer or str
+        the points
+    @param options: RenderOptions
+        the settings of the render, or None'''
+
+    if isinstance(value, PointBuffer):
+        return value.render(options)
+    return value
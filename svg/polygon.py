@@ -1,18 +1,11 @@
-from base import SVGBase
+from polyline import Polyline
 
-class Polygon(SVGBase):
-    '''An SVG line.'''
+class Polygon(Polyline):
+    '''An SVG polygon, a polyline whose last point is joined back to its
+    first.'''
 
-    TAG = 'polygon'
-
-    def __init__(self, *args, **kwargs):
-        '''Create the polygon object, with additional metadata.
+    __slots__ = ()
 
-        @param args: positional arguments
-            the points of the polygon, as (x,y) float pairs
-        @param kwargs: keyword parameters
-            additional metadata as key/value pairs'''
-
-        points = ' '.join('{},{}'.format(*a) for a in args)
-        super(Polyline, self).__init__(points=points, **kwargs)
+    TAG = 'polygon'
 
+    CLOSED = True
@@ -1,18 +1,112 @@
+import affine
+from attrs import Attribute
 from base import SVGBase
+from points import PointBuffer, from_arguments, render_points
+from simplify import simplify_points
 
 class Polyline(SVGBase):
-    '''An SVG line.'''
+    '''An SVG polyline.'''
+
+    __slots__ = ()
 
     TAG = 'polyline'
 
+    # whether the last point is joined back to the first
+    CLOSED = False
+
+    RENDERERS = {
+        'points': render_points
+    }
+
+    points = Attribute('points')
+
     def __init__(self, *args, **kwargs):
-        '''Create the polyline object, with additional metadata.
+        '''Create the element, with additional metadata. The points are kept
+        as numbers, and only formatted when the element is rendered.
+
+        The points can also be given as a single (N, 2) array, or object
+        exposing native doubles through the buffer protocol, as the only
+        positional argument, or as two parallel arrays with the xs and ys
+        keywords. They are then wrapped rather than copied - see
+        PointBuffer.wrap.
 
         @param args: positional arguments
-            the points of the polyline, as (x,y) float pairs
+            the points, as (x,y) float pairs
         @param kwargs: keyword parameters
             additional metadata as key/value pairs'''
 
-        points = ' '.join('{},{}'.format(*a) for a in args)
+        points = from_arguments(args, kwargs)
         super(Polyline, self).__init__(points=points, **kwargs)
 
+    def _point_buffer(self):
+        '''Return the points as a PointBuffer, parsing them if they were set
+        as a string.'''
+
+        points = self.points
+        if isinstance(points, basestring):
+            points = PointBuffer.parse(points)
+        return points
+
+    def local_bbox(self):
+        '''Return the bounding box of the points, or None if there are none or
+        they cannot be parsed.'''
+
+        try:
+            return self._point_buffer().bounds()
+        except (AttributeError, ValueError):
+            return None
+
+    def simplify(self, tolerance=0.5, method='rdp'):
+        '''Simplify the element in place, removing points that make no
+        visible difference, and return a reference to it. The first and last
+        points are always kept, and on closed shapes the edge joining them
+        is taken into account.
+
+        @param tolerance: optional, float
+            for 'rdp', the largest distance a removed point may lie from the
+            simplified outline; for 'visvalingam', the smallest triangle area
+            a point must form with its neighbours to be kept
+        @param method: optional, str
+            'rdp' for Ramer-Douglas-Peucker, 'visvalingam' for
+            Visvalingam-Whyatt, or 'pixels' to keep only the points that can
+            change a pixel of the canvas the element is drawn on'''
+
+        points = self._point_buffer()
+        matrix = self.device_matrix() if method == 'pixels' else None
+
+        xs, ys = points.xs, points.ys
+        count = len(xs)
+        if self.CLOSED and count > 2:
+            # simplify the closed outline, ending back at the first point
+            xs.append(xs[0])
+            ys.append(ys[0])
+
+        keep = simplify_points(xs, ys, tolerance, method, matrix)
+        keep = [i for i in keep if i < count]
+        if len(keep) < len(points):
+            self.points = points.select(keep)
+
+        return self
+
+    def bake(self, matrix, attributes):
+        '''Bake a similarity transformation into the points.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this element'''
+
+        scale = affine.similarity_scale(matrix)
+        if scale is None:
+            return False
+
+        try:
+            points = self._point_buffer()
+        except (AttributeError, ValueError):
+            return False
+
+        if not self._bake_stroke(attributes, scale):
+            return False
+
+        attributes['points'] = points.transformed(matrix)
+        return True
@@ -0,0 +1,36 @@
+from base import SVGBase
+
+class Raw(SVGBase):
+    '''A piece of a loaded document that is not modelled by any element
+    class, such as an unknown element or text mixed with elements. It is
+    written out exactly as it was read.'''
+
+    __slots__ = ('raw',)
+
+    TAG = None
+
+    def __init__(self, raw):
+        '''Create the piece.
+
+        @param raw: str
+            the XML of the piece, as it appears in the document'''
+
+        super(Raw, self).__init__(load_defaults=False)
+        object.__setattr__(self, 'raw', raw)
+
+    def _iter_render(self, options, level, inherited, ctm):
+        '''Yield the XML of the piece, unchanged.
+
+        @param options: RenderOptions
+            the settings of the render
+        @param level: int
+            the level of nesting this element is at
+        @param inherited: tuple
+            the transformation pushed down from baked ancestors, or None
+        @param ctm: tuple
+            the transformation from the parent's coordinate system to that
+            of the element the render started from'''
+
+        padding = '' if not options.pretty else ' ' * (2 * level)
+        yield padding + self.raw
+
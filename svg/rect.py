@@ -1,10 +1,19 @@
+import affine
+from attrs import Attribute
 from base import SVGBase
 
 class Rect(SVGBase):
     '''An SVG rect.'''
 
+    __slots__ = ()
+
     TAG = 'rect'
 
+    x = Attribute('x')
+    y = Attribute('y')
+    width = Attribute('width')
+    height = Attribute('height')
+
     def __init__(self, x, y, width, height, **kwargs):
         '''Create the rect object, with additional metadata.
 
@@ -21,3 +30,47 @@ class Rect(SVGBase):
 
         super(Rect, self).__init__(x=x, y=y, width=width, height=height, **kwargs)
 
+    def local_bbox(self):
+        '''Return the bounding box of the rect, or None if its geometry is not
+        numeric.'''
+
+        try:
+            x, y = float(self.x), float(self.y)
+            width, height = float(self.width), float(self.height)
+        except (AttributeError, ValueError):
+            return None
+
+        return (min(x, x + width), min(y, y + height),
+                max(x, x + width), max(y, y + height))
+
+    def bake(self, matrix, attributes):
+        '''Bake a transformation into the corners of the rect. Only similarity
+        transformations that keep the sides axis-aligned can be baked.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this rect'''
+
+        scale = affine.similarity_scale(matrix)
+        if scale is None or not affine.is_axis_aligned(matrix):
+            return False
+
+        try:
+            x, y = float(self.x), float(self.y)
+            width, height = float(self.width), float(self.height)
+            corners = dict((k, float(attributes[k]) * scale)
+                           for k in ('rx', 'ry') if k in attributes)
+        except (AttributeError, ValueError):
+            return False
+
+        if not self._bake_stroke(attributes, scale):
+            return False
+
+        x1, y1 = affine.apply(matrix, x, y)
+        x2, y2 = affine.apply(matrix, x + width, y + height)
+
+        attributes['x'], attributes['y'] = min(x1, x2), min(y1, y2)
+        attributes['width'], attributes['height'] = abs(x2 - x1), abs(y2 - y1)
+        attributes.update(corners)
+        return True
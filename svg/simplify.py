@@ -0,0 +1,191 @@
+'''Polyline simplification. Each function takes the coordinates of a run of
+connected points as two parallel lists, and returns the indices of the points
+to keep, in order. The first and last points are always kept.'''
+
+from heapq import heapify, heappop, heappush
+import math
+
+import affine
+
+# the simplification methods, by name
+METHODS = ('rdp', 'visvalingam', 'pixels')
+
+def douglas_peucker(xs, ys, tolerance):
+    '''Simplify with the Ramer-Douglas-Peucker algorithm, which keeps every
+    point needed to stay within a distance of tolerance of the original line.
+    Its cost grows with the number of points kept, so for display of very
+    dense data the linear pixel_columns is much cheaper.
+
+    @param xs: list
+        the x-coordinates of the points
+    @param ys: list
+        the y-coordinates of the points
+    @param tolerance: float
+        the largest distance, in user units, a removed point may lie from the
+        simplified line'''
+
+    n = len(xs)
+    if n < 3:
+        return range(n)
+
+    keep = bytearray(n)
+    keep[0] = keep[n-1] = 1
+
+    tolerance2 = tolerance * tolerance
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        x0, y0 = xs[first], ys[first]
+        dx, dy = xs[last] - x0, ys[last] - y0
+        norm = dx * dx + dy * dy
+
+        best, index = -1.0, first
+        if norm:
+            # compare squared cross products, and only scale the largest one
+            # back to a squared distance
+            for i in xrange(first + 1, last):
+                cross = dx * (ys[i] - y0) - dy * (xs[i] - x0)
+                cross *= cross
+                if cross > best:
+                    best, index = cross, i
+            best /= norm
+        else:
+            for i in xrange(first + 1, last):
+                ex, ey = xs[i] - x0, ys[i] - y0
+                distance = ex * ex + ey * ey
+                if distance > best:
+                    best, index = distance, i
+
+        if best > tolerance2:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [i for i in xrange(n) if keep[i]]
+
+def visvalingam(xs, ys, tolerance):
+    '''Simplify with the Visvalingam-Whyatt algorithm, which repeatedly removes
+    the point forming the smallest triangle with its neighbours.
+
+    @param xs: list
+        the x-coordinates of the points
+    @param ys: list
+        the y-coordinates of the points
+    @param tolerance: float
+        the smallest triangle area, in square user units, a point must form
+        with its neighbours to be kept'''
+
+    n = len(xs)
+    if n < 3:
+        return range(n)
+
+    prev = range(-1, n - 1)
+    following = range(1, n + 1)
+
+    def area(i):
+        p, q = prev[i], following[i]
+        return abs((xs[p] - xs[i]) * (ys[q] - ys[i]) -
+                   (xs[q] - xs[i]) * (ys[p] - ys[i])) / 2.0
+
+    areas = [0.0] + [area(i) for i in xrange(1, n - 1)] + [0.0]
+    heap = [(areas[i], i) for i in xrange(1, n - 1)]
+    heapify(heap)
+
+    removed = bytearray(n)
+    while heap:
+        smallest, i = heappop(heap)
+
+        # skip entries made stale by a neighbour's removal
+        if removed[i] or smallest != areas[i]:
+            continue
+
+        if smallest >= tolerance:
+            break
+
+        removed[i] = 1
+        p, q = prev[i], following[i]
+        following[p], prev[q] = q, p
+
+        # a neighbour's area never drops below that of the point removed
+        # before it, so points are removed in order of significance
+        for j in (p, q):
+            if 0 < j < n - 1:
+                areas[j] = max(area(j), smallest)
+                heappush(heap, (areas[j], j))
+
+    return [i for i in xrange(n) if not removed[i]]
+
+def pixel_columns(xs, ys, matrix=None):
+    '''Simplify for display, keeping only the points that can change which
+    pixels are drawn. The points are mapped to device space, and of every run
+    of consecutive points falling in the same pixel column only the first,
+    last, lowest and highest are kept. This runs in a single linear pass.
+
+    @param xs: list
+        the x-coordinates of the points
+    @param ys: list
+        the y-coordinates of the points
+    @param matrix: optional, tuple
+        the transformation from user space to device pixels'''
+
+    n = len(xs)
+    if n < 3:
+        return range(n)
+
+    a, b, c, d, e, f = matrix or affine.IDENTITY
+    floor = math.floor
+
+    keep = []
+    column = None
+    first = low = high = 0
+    low_y = high_y = 0.0
+
+    for i in xrange(n):
+        x, y = xs[i], ys[i]
+        col = floor(a * x + c * y + e)
+        device_y = b * x + d * y + f
+
+        if col != column:
+            if column is not None:
+                keep.extend(sorted(set((first, low, high, i - 1))))
+
+            column = col
+            first = low = high = i
+            low_y = high_y = device_y
+
+        elif device_y < low_y:
+            low, low_y = i, device_y
+
+        elif device_y > high_y:
+            high, high_y = i, device_y
+
+    keep.extend(sorted(set((first, low, high, n - 1))))
+    return keep
+
+def simplify_points(xs, ys, tolerance, method, matrix=None):
+    '''Simplify a run of points with the named method.
+
+    @param xs: list
+        the x-coordinates of the points
+    @param ys: list
+        the y-coordinates of the points
+    @param tolerance: float
+        the tolerance of the method, unused by 'pixels'
+    @param method: str
+        one of the names in METHODS
+    @param matrix: optional, tuple
+        the transformation from user space to device pixels, used by the
+        pixels method'''
+
+    if method == 'rdp':
+        return douglas_peucker(xs, ys, tolerance)
+    if method == 'visvalingam':
+        return visvalingam(xs, ys, tolerance)
+    if method == 'pixels':
+        return pixel_columns(xs, ys, matrix)
+
+    raise ValueError('unknown simplification method {!r}'.format(method))
@@ -0,0 +1,296 @@
+'''A uniform grid index over the elements of a subtree, for hit-testing.'''
+
+import math
+
+import affine
+import bounds
+from lazy import LazyChildren, SharedChildren
+
+class GridIndex(object):
+    '''A spatial index over the leaf elements below a root element, in the
+    coordinate system of the root's children, so that every transformation
+    between the root and a leaf is taken into account. Each leaf is filed
+    under every grid cell its bounding box touches, and leaves spanning too
+    many cells are kept aside and checked on every query.
+
+    Changes below the root are reported to the index by invalidate() and
+    add_child, and are applied the next time it is queried: changed and
+    added subtrees are filed again, while a change to the root itself
+    rebuilds the index. Leaves whose bounding box is not known are left out.'''
+
+    __slots__ = ('root', 'cell', 'cells', 'large', 'entries', 'dirty',
+                 'stale', 'counter')
+
+    # the most cells a leaf is filed under before it is kept aside instead
+    MAX_CELLS = 64
+
+    def __init__(self, root):
+        '''Create the index, and build it over the subtree.
+
+        @param root: SVGBase
+            the element whose descendants are indexed'''
+
+        self.root = root
+        self.build()
+
+    def build(self):
+        '''Build the index from scratch over the current subtree, choosing a
+        cell size that puts about one leaf in each cell.'''
+
+        self.cells = {}
+        self.large = set()
+        self.entries = {}
+        self.dirty = {}
+        self.stale = False
+        self.counter = 0
+
+        leaves = []
+        for child in self.root.children:
+            leaves.extend(self._leaves(child, None))
+
+        boxes = [box for _, _, box in leaves if box is not None]
+        extent = bounds.union(boxes)
+        if extent is None:
+            self.cell = 1.0
+        else:
+            area = (extent[2] - extent[0]) * (extent[3] - extent[1])
+            self.cell = math.sqrt(float(area) / len(boxes)) or max(
+                extent[2] - extent[0], extent[3] - extent[1], 1.0)
+
+        for element, ctm, box in leaves:
+            self._insert(element, ctm, box)
+
+    def changed(self, element):
+        '''Note that an element below the root, or the root itself, has
+        changed or been added.
+
+        @param element: SVGBase
+            the element'''
+
+        if element is self.root:
+            self.stale = True
+        else:
+            self.dirty[id(element)] = element
+
+    def refresh(self):
+        '''Apply every change noted since the index was last queried.'''
+
+        if self.stale:
+            self.build()
+            return
+
+        dirty = self.dirty
+        if not dirty:
+            return
+
+        for element in dirty.values():
+            ctm = self._ctm(element._parent)
+
+            # leaves filed again keep their place in the order
+            orders = {}
+            for leaf, _, _ in self._leaves(element, None, False):
+                orders[id(leaf)] = self._remove(leaf)
+
+            if ctm is not False:
+                for leaf, leaf_ctm, box in self._leaves(element, ctm):
+                    self._insert(leaf, leaf_ctm, box, orders.get(id(leaf)))
+
+        dirty.clear()
+
+    def elements_at(self, x, y):
+        '''Return the leaves whose geometry box contains a point, in the order
+        they were indexed. The point is mapped into each leaf's own
+        coordinates, so rotated and skewed leaves are tested against their
+        own box rather than the larger box around it.
+
+        @param x: float
+            the x-coordinate of the point
+        @param y: float
+            the y-coordinate of the point'''
+
+        self.refresh()
+
+        cell = self.cell
+        key = (int(math.floor(x / cell)), int(math.floor(y / cell)))
+        candidates = self.cells.get(key, set()) | self.large
+
+        found = []
+        for entry in map(self.entries.__getitem__, candidates):
+            element, box, inverse, local, _, order = entry
+            if not bounds.contains(box, x, y):
+                continue
+
+            if inverse is not None:
+                if not bounds.contains(local, *affine.apply(inverse, x, y)):
+                    continue
+
+            found.append((order, element))
+
+        found.sort()
+        return [element for _, element in found]
+
+    def elements_in(self, rect):
+        '''Return the leaves whose bounding box overlaps a rectangle, in the
+        order they were indexed.
+
+        @param rect: tuple
+            the rectangle, as an (x, y, width, height) tuple'''
+
+        self.refresh()
+
+        x, y, width, height = rect
+        box = (x, y, x + width, y + height)
+
+        keys = self._keys(box, len(self.cells))
+        if keys is None:
+            candidates = set(self.entries)
+        else:
+            candidates = set(self.large)
+            for key in keys:
+                candidates.update(self.cells.get(key, ()))
+
+        found = []
+        for entry in map(self.entries.__getitem__, candidates):
+            if bounds.intersects(box, entry[1]):
+                found.append((entry[5], entry[0]))
+
+        found.sort()
+        return [element for _, element in found]
+
+    def _ctm(self, node):
+        '''Return the transformation from the coordinates of an element's
+        children to those of the root's children, or False if the element is
+        not the root or below it.
+
+        @param node: SVGBase
+            the element'''
+
+        matrix = None
+        while node is not self.root:
+            if node is None:
+                return False
+            matrix = affine.multiply(node._matrix, matrix)
+            node = node._parent
+
+        return matrix
+
+    def _leaves(self, element, ctm, boxes=True):
+        '''Yield every leaf in a subtree as an (element, ctm, box) tuple,
+        where ctm is the transformation from the leaf's parent to the index
+        and box the leaf's bounding box in the index, or None if it is not
+        known or not asked for.
+
+        @param element: SVGBase
+            the root of the subtree
+        @param ctm: tuple
+            the transformation from the element's parent to the index
+        @param boxes: optional, bool
+            whether to work out the boxes'''
+
+        stack = [(element, ctm)]
+        while stack:
+            element, ctm = stack.pop()
+
+            children = element._children
+            if type(children) in (LazyChildren, SharedChildren):
+                children = element.children
+            if children:
+                ctm = affine.multiply(ctm, element._matrix)
+                stack.extend((child, ctm) for child in reversed(children))
+                continue
+
+            box = element.bbox() if boxes else None
+            if box is not None:
+                box = bounds.transform(ctm, box)
+            yield element, ctm, box
+
+    def _keys(self, box, limit):
+        '''Return the keys of the grid cells a box touches, or None if there
+        are more than a limit.
+
+        @param box: tuple
+            the box
+        @param limit: int
+            the most keys to return'''
+
+        cell = self.cell
+        floor = math.floor
+
+        columns = xrange(int(floor(box[0] / cell)), int(floor(box[2] / cell)) + 1)
+        rows = xrange(int(floor(box[1] / cell)), int(floor(box[3] / cell)) + 1)
+        if len(columns) * len(rows) > limit:
+            return None
+
+        return [(i, j) for i in columns for j in rows]
+
+    def _insert(self, element, ctm, box, order=None):
+        '''File a leaf in the index.
+
+        @param element: SVGBase
+            the leaf
+        @param ctm: tuple
+            the transformation from the leaf's parent to the index
+        @param box: tuple
+            the bounding box of the leaf in the index, or None
+        @param order: optional, int
+            the place of the leaf in the order, if it was filed before'''
+
+        if box is None:
+            return
+
+        key = id(element)
+
+        # untransformed leaves are tested against the box alone, others
+        # against their own box, with points mapped back into it
+        matrix = affine.multiply(ctm, element._matrix)
+        local = inverse = None
+        if matrix is not None:
+            try:
+                inverse = affine.inverse(matrix)
+                local = element.local_bbox()
+            except ValueError:
+                pass
+
+        keys = self._keys(box, self.MAX_CELLS)
+        if keys is None:
+            self.large.add(key)
+        else:
+            cells = self.cells
+            for k in keys:
+                members = cells.get(k)
+                if members is None:
+                    cells[k] = set((key,))
+                else:
+                    members.add(key)
+
+        if order is None:
+            order = self.counter
+            self.counter += 1
+
+        self.entries[key] = (element, box, inverse, local, keys, order)
+
+    def _remove(self, element):
+        '''Take a leaf out of the index, if it is in it, and return its place
+        in the order, or None.
+
+        @param element: SVGBase
+            the leaf'''
+
+        key = id(element)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+
+        keys = entry[4]
+        if keys is None:
+            self.large.discard(key)
+            return entry[5]
+
+        cells = self.cells
+        for k in keys:
+            members = cells[k]
+            members.discard(key)
+            if not members:
+                del cells[k]
+
+        return entry[5]
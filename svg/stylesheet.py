@@ -0,0 +1,161 @@
+'''Hoisting of repeated presentation attributes into a <style> block.
+
+Before a stylesheet render, the presentation attributes of every element in
+the document are collected, and each combination used by more than one
+element is given a short class name. As elements are rendered, those using
+one of the combinations have their presentation attributes replaced by the
+class, and the rules for the classes are written in a single <style> block
+at the top of the document.'''
+
+# the attributes that can be set from CSS, from the SVG specification
+PRESENTATION = frozenset((
+    'alignment-baseline', 'baseline-shift', 'clip', 'clip-path', 'clip-rule',
+    'color', 'color-interpolation', 'color-interpolation-filters',
+    'color-profile', 'color-rendering', 'cursor', 'direction', 'display',
+    'dominant-baseline', 'enable-background', 'fill', 'fill-opacity',
+    'fill-rule', 'filter', 'flood-color', 'flood-opacity', 'font-family',
+    'font-size', 'font-size-adjust', 'font-stretch', 'font-style',
+    'font-variant', 'font-weight', 'glyph-orientation-horizontal',
+    'glyph-orientation-vertical', 'image-rendering', 'kerning',
+    'letter-spacing', 'lighting-color', 'marker-end', 'marker-mid',
+    'marker-start', 'mask', 'opacity', 'overflow', 'pointer-events',
+    'shape-rendering', 'stop-color', 'stop-opacity', 'stroke',
+    'stroke-dasharray', 'stroke-dashoffset', 'stroke-linecap',
+    'stroke-linejoin', 'stroke-miterlimit', 'stroke-opacity', 'stroke-width',
+    'text-anchor', 'text-decoration', 'text-rendering', 'unicode-bidi',
+    'visibility', 'word-spacing', 'writing-mode'))
+
+# the properties holding a single length, which CSS needs a unit for
+LENGTHS = frozenset((
+    'baseline-shift', 'font-size', 'kerning', 'letter-spacing',
+    'stroke-dashoffset', 'stroke-width', 'word-spacing'))
+
+# characters that cannot be written into a rule as they are
+UNSAFE = frozenset('<>&{};')
+
+def class_name(index):
+    '''Return the short class name for a combination, from 'a' to 'z' and
+    then on to two letters and more.
+
+    @param index: int
+        the index of the combination, most used first'''
+
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
+    name = ''
+    while True:
+        index, remainder = divmod(index, 26)
+        name = letters[remainder] + name
+        if not index:
+            return name
+        index -= 1
+
+def _presentation(attributes, values):
+    '''Return the presentation attributes among a set of attributes, as a
+    frozenset of (name, value) pairs with the values formatted as they are
+    written out.
+
+    @param attributes: dict
+        the attributes
+    @param values: Serializer
+        the formatting of attribute values'''
+
+    return frozenset([(name, values(attributes[name]))
+                      for name in PRESENTATION.intersection(attributes)])
+
+class Stylesheet(object):
+    '''The classes for the combinations of presentation attributes repeated
+    in a document.'''
+
+    __slots__ = ('root', 'values', 'classes')
+
+    # put before every class name, so that the classes do not clash with
+    # those of a page the document is inlined into
+    PREFIX = 'svg-'
+
+    def __init__(self, root, values):
+        '''Collect the presentation attributes used below an element, and name
+        the combinations used more than once.
+
+        @param root: SVGBase
+            the element the render starts from
+        @param values: Serializer
+            the formatting of attribute values in the render'''
+
+        self.root = root
+        self.values = values
+
+        counts = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+
+            attributes = dict(node._meta or ())
+            attributes.update(node.defaults())
+            attributes.update(node.attributes)
+
+            key = _presentation(attributes, values)
+            if key and not any(UNSAFE.intersection(v) for _, v in key):
+                # batches write one tag per element
+                weight = len(node) if hasattr(type(node), '__len__') else 1
+                counts[key] = counts.get(key, 0) + weight
+
+            stack.extend(node._children or ())
+
+        common = sorted((key for key, count in counts.iteritems() if count > 1),
+                        key=lambda key: (-counts[key], sorted(key)))
+
+        self.classes = dict((key, self.PREFIX + class_name(i))
+                            for i, key in enumerate(common))
+
+    def apply(self, attributes):
+        '''Replace the presentation attributes of an element with its class,
+        if they are one of the named combinations.
+
+        @param attributes: dict
+            the rendered attributes of the element'''
+
+        key = _presentation(attributes, self.values)
+        name = self.classes.get(key)
+        if name is None:
+            return
+
+        for attribute, _ in key:
+            del attributes[attribute]
+
+        existing = attributes.get('class')
+        attributes['class'] = '{} {}'.format(existing, name) if existing else name
+
+    def render(self, pretty, level):
+        '''Return the <style> element holding the rules for every class.
+
+        @param pretty: bool
+            a flag controlling pretty printing
+        @param level: int
+            the level of nesting the element is at'''
+
+        padding = '' if not pretty else ' ' * (2 * level)
+
+        rules = []
+        for key, name in sorted(self.classes.iteritems(),
+                                key=lambda kv: (len(kv[1]), kv[1])):
+            declarations = []
+            for attribute, value in sorted(key):
+                if attribute in LENGTHS and _is_number(value):
+                    value += 'px'
+                declarations.append('{}:{}'.format(attribute, value))
+            rules.append('.{}{{{}}}'.format(name, ';'.join(declarations)))
+
+        return '{0}<style>\n{1}\n{0}</style>'.format(padding, '\n'.join(rules))
+
+def _is_number(text):
+    '''Return whether a value is a bare number.
+
+    @param text: str
+        the value'''
+
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
@@ -1,10 +1,17 @@
+import affine
+from attrs import Attribute
 from base import SVGBase
 
 class Text(SVGBase):
     '''SVG text.'''
 
+    __slots__ = ()
+
     TAG = 'text'
 
+    x = Attribute('x')
+    y = Attribute('y')
+
     def __init__(self, x, y, text, **kwargs):
         '''Create the text object, with additional metadata.
 
@@ -18,3 +25,48 @@ class Text(SVGBase):
             additional metadata as key/value pairs'''
 
         super(Text, self).__init__(x=x, y=y, content=text, **kwargs)
+
+    # the font size assumed when the text does not set one, in user units
+    DEFAULT_FONT_SIZE = 16.0
+
+    def local_bbox(self):
+        '''Return a conservative estimate of the bounding box of the text.
+        Glyph metrics are not known without a font, so every character is
+        taken to be as wide as the font size, in either direction from x to
+        allow for any text-anchor, and the box spans a full font size above
+        the baseline and half of one below it. Returns None if the position or
+        font size is not numeric, or the text holds other elements.'''
+
+        # loaded text keeps its characters unparsed until they are needed
+        if self._children is not None and self.children:
+            return None
+
+        try:
+            x, y = float(self.x), float(self.y)
+            size = float(self.attributes.get('font-size', self.DEFAULT_FONT_SIZE))
+        except (AttributeError, ValueError):
+            return None
+
+        width = len(self._text()) * size
+        return (x - width, y - size, x + width, y + size / 2.0)
+
+    def bake(self, matrix, attributes):
+        '''Bake a translation into the position of the text. Any other
+        transformation would change the glyphs themselves, so it cannot be
+        baked.
+
+        @param matrix: tuple
+            the transformation, as an affine matrix
+        @param attributes: dict
+            the rendered attributes of this text'''
+
+        if not affine.is_translation(matrix):
+            return False
+
+        try:
+            x, y = float(self.x), float(self.y)
+        except (AttributeError, ValueError):
+            return False
+
+        attributes['x'], attributes['y'] = affine.apply(matrix, x, y)
+        return True
@@ -0,0 +1,66 @@
+import bounds
+from attrs import Attribute
+from base import SVGBase
+
+class Use(SVGBase):
+    '''An SVG use element, drawing a copy of a symbol defined on the canvas.'''
+
+    __slots__ = ('symbol',)
+
+    TAG = 'use'
+
+    x = Attribute('x')
+    y = Attribute('y')
+
+    def __init__(self, symbol, x=0, y=0, **kwargs):
+        '''Create the use element, with additional metadata.
+
+        @param symbol: SVGBase
+            the symbol to draw, as returned by Canvas.define
+        @param x: optional, float
+            the x offset of the copy
+        @param y: optional, float
+            the y offset of the copy
+        @param kwargs: keyword parameters
+            additional metadata as key/value pairs'''
+
+        name = symbol.attributes.get('id')
+        if not name:
+            raise ValueError('only symbols defined on a canvas can be used')
+
+        kwargs['load_defaults'] = False
+        super(Use, self).__init__(x=x, y=y, **kwargs)
+
+        self.attributes['xlink:href'] = '#' + name
+        object.__setattr__(self, 'symbol', symbol)
+
+    def local_bbox(self):
+        '''Return the bounding box of the symbol, offset by x and y, or None
+        if it is not known.'''
+
+        # loaded uses do not know their symbol
+        symbol = self.symbol
+        if symbol is None:
+            return None
+
+        box = symbol.bbox()
+        if box is None:
+            return None
+
+        try:
+            x, y = float(self.x), float(self.y)
+        except (AttributeError, ValueError):
+            return None
+
+        return (box[0] + x, box[1] + y, box[2] + x, box[3] + y)
+
+    def bbox(self):
+        '''Return the bounding box of the copy in the coordinate system of its
+        parent. It is not cached, since changes to the symbol are not tracked
+        by the copies that use it.'''
+
+        box = self.local_bbox()
+        if box is None:
+            return None
+
+        return bounds.transform(self._matrix, box)
@@ -0,0 +1,193 @@
+'''Serialization of attribute values and text content.
+
+Every value written into a tag goes through a Serializer, chosen by the
+precision and snap render settings. Numbers are written with up to 12
+significant digits, or rounded to a number of decimal places when a
+precision is given, always without a trailing '.0' on integral values, and
+optionally snapped to the nearest integer when they lie close enough to it.
+Numbers are known to be safe and are never escaped, while strings have &, <,
+> and double quotes replaced by entities.
+
+Colours, widths and the like repeat throughout a document, so short strings
+and floats are formatted once and then taken from a small cache kept by each
+serializer.'''
+
+import re
+
+# the characters replaced by entities in attribute values, and in text
+_ATTRIBUTE = re.compile(r'[&<>"]')
+_TEXT = re.compile(r'[&<>]')
+_ENTITIES = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}
+
+# the serializer for each combination of settings
+_SERIALIZERS = {}
+
+def _entity(match):
+    '''Return the entity for an escaped character.'''
+
+    return _ENTITIES[match.group()]
+
+def escape(value):
+    '''Return a string escaped for use as an attribute value.
+
+    @param value: str
+        the string'''
+
+    if _ATTRIBUTE.search(value) is None:
+        return value
+    return _ATTRIBUTE.sub(_entity, value)
+
+def escape_text(value):
+    '''Return a string escaped for use as the text content of an element.
+
+    @param value: str
+        the string'''
+
+    if not value or _TEXT.search(value) is None:
+        return value
+    return _TEXT.sub(_entity, value)
+
+def serializer(precision=None, snap=None):
+    '''Return the serializer for a combination of settings, which is shared by
+    every render using them, along with its cache.
+
+    @param precision: optional, int
+        the number of decimal places numbers are rounded to, or None to write
+        up to 12 significant digits
+    @param snap: optional, float
+        the largest distance from an integer at which numbers are written as
+        that integer, or None to only write integral values as integers'''
+
+    key = (precision, snap)
+    values = _SERIALIZERS.get(key)
+    if values is None:
+        values = _SERIALIZERS[key] = Serializer(precision, snap)
+    return values
+
+class Serializer(object):
+    '''The formatting of values for output, for one combination of precision
+    and snapping settings. Calling a serializer with a value returns the
+    text to write between the quotes of an attribute. Use serializer() to get
+    the shared instance for a combination of settings.'''
+
+    __slots__ = ('precision', 'snap', '_numbers', '_strings')
+
+    # the most values of each kind kept in the cache, which is emptied when
+    # it fills up
+    CACHE_SIZE = 1024
+
+    # the longest strings that are cached - longer ones, such as path data,
+    # rarely repeat
+    MAX_CACHED_LENGTH = 64
+
+    def __init__(self, precision=None, snap=None):
+        '''Create the serializer.
+
+        @param precision: optional, int
+            the number of decimal places numbers are rounded to, or None to
+            write up to 12 significant digits
+        @param snap: optional, float
+            the largest distance from an integer at which numbers are written
+            as that integer, or None to only write integral values as
+            integers'''
+
+        self.precision = precision
+        self.snap = snap
+        self._numbers = {}
+        self._strings = {}
+
+    def __reduce__(self):
+        '''Pickle the serializer by its settings, so that unpickling gives the
+        shared instance.'''
+
+        return serializer, (self.precision, self.snap)
+
+    @property
+    def exact(self):
+        '''True if numbers are written with all the digits they are kept with,
+        as they are when neither precision nor snapping is set.'''
+
+        return self.precision is None and self.snap is None
+
+    def __call__(self, value):
+        '''Return a value formatted and escaped for use as an attribute value.
+
+        @param value: object
+            the value'''
+
+        cls = type(value)
+
+        if cls is str:
+            strings = self._strings
+            text = strings.get(value)
+            if text is None:
+                text = escape(value)
+                if len(value) <= self.MAX_CACHED_LENGTH:
+                    if len(strings) >= self.CACHE_SIZE:
+                        strings.clear()
+                    strings[value] = text
+            return text
+
+        if cls is float:
+            numbers = self._numbers
+            text = numbers.get(value)
+            if text is None:
+                text = self.number(value)
+                if len(numbers) >= self.CACHE_SIZE:
+                    numbers.clear()
+                numbers[value] = text
+            return text
+
+        if cls is int or cls is long:
+            return str(value)
+
+        if isinstance(value, basestring):
+            return escape(value)
+
+        # other numeric types, such as those of NumPy
+        if isinstance(value, (int, long, float)) and cls is not bool:
+            return self.number(value)
+
+        return escape(str(value))
+
+    def plain(self, value):
+        '''Return a value formatted as __call__ does, but without escaping,
+        for output other than XML.
+
+        @param value: object
+            the value'''
+
+        cls = type(value)
+        if cls is float:
+            return self.number(value)
+        if cls is int or cls is long or cls is str:
+            return str(value)
+        if isinstance(value, basestring):
+            return value
+        if isinstance(value, (int, long, float)) and cls is not bool:
+            return self.number(value)
+        return str(value)
+
+    def number(self, value):
+        '''Return a number formatted for output.
+
+        @param value: float
+            the number'''
+
+        snap = self.snap
+        if snap is not None:
+            nearest = round(value)
+            if abs(value - nearest) <= snap:
+                value = nearest
+
+        precision = self.precision
+        if precision is None:
+            text = '%.12g' % value
+        else:
+            text = '%.*f' % (precision, value)
+            if '.' in text:
+                text = text.rstrip('0').rstrip('.')
+
+        if text == '-0':
+            return '0'
+        return text